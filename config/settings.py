@@ -1,11 +1,21 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+_env_loaded = False
+
+def _getenv(name: str):
+    """Read an environment variable, parsing .env on first use only."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+    return os.getenv(name)
 
 class Config:
-    # API Keys - Using Together AI
-    TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")
+    # API Keys - Using Together AI (read lazily so importing config skips .env parsing)
+    @property
+    def TOGETHER_API_KEY(self):
+        return _getenv("TOGETHER_API_KEY")
     
     # Models - Llama 3 70B Chat
     TOGETHER_MODEL = "meta-llama/Llama-3-70b-chat-hf"
@@ -26,6 +36,22 @@ class Config:
     # Reduce rationales for FEVER to save tokens (full pipeline uses more)
     NUM_RATIONALES_FEVER = 3  # Use fewer for FEVER since it always runs full pipeline
     
+    # Response cache for repeated evaluations (opt in with COK_CACHE=1)
+    @property
+    def RESPONSE_CACHE_ENABLED(self):
+        return _getenv("COK_CACHE") == "1"
+    
+    # Knowledge search results are cached on disk (set CACHE_BYPASS=1 to skip the cache)
+    @property
+    def CACHE_BYPASS(self):
+        return _getenv("CACHE_BYPASS") == "1"
+    SEARCH_CACHE_TTL = 7 * 24 * 3600  # Seconds before cached Wikipedia/Wikidata results expire
+    
+    # Evaluation Parameters
+    EVAL_PARALLELISM = 4  # Samples evaluated concurrently (bounded by API rate limits)
+    EVAL_MAX_RETRIES = 3  # Retries per sample after a rate-limit (429) error
+    EVAL_BATCH_SIZE = 1  # Questions answered per LLM call (>1 bypasses the CoK pipeline; never used for FEVER)
+    
     # Logging
     LOG_LEVEL = "INFO"
     LOG_FILE = "logs/cok.log"
@@ -33,5 +59,7 @@ class Config:
     # Data
     DATASET_CACHE_DIR = "./data/datasets"
     RESULTS_DIR = "./data/results"
+    RESPONSE_CACHE_DIR = "./data/cache"
+    SEARCH_CACHE_DIR = "./data/cache/search"
 
 config = Config()
@@ -1,5 +1,7 @@
-from datasets import load_dataset
-from typing import List, Dict, Any
+import numpy as np
+import os
+import random
+from typing import Dict, Any, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,105 +9,175 @@ logger = logging.getLogger(__name__)
 class DatasetManager:
     """Manage loading of benchmark datasets."""
     
+    # Benchmark name -> HF (name, config) candidates tried in order, and preferred split
+    _DATASETS = {
+        # tweet_eval/stance_climate substitutes for FEVER when it is unavailable
+        # FEVER and HotpotQA are large, so they are streamed rather than fully downloaded
+        'fever': {
+            'sources': [('fever', None), ('tweet_eval', 'stance_climate')],
+            'split': 'validation',
+            'streaming': True,
+        },
+        'hotpotqa': {
+            'sources': [('hotpot_qa', 'distractor')],
+            'split': 'validation',
+            'streaming': True,
+        },
+        # Test split has cop=-1 (no labels), so use validation
+        'medmcqa': {
+            'sources': [('medmcqa', None)],
+            'split': 'validation',
+        },
+        # MMLU splits are small with no ordering bias, so the first rows are taken as-is
+        'mmlu_physics': {
+            'sources': [('cais/mmlu', 'college_physics'), ('cais/mmlu', 'high_school_physics')],
+            'split': 'test',
+            'shuffle': False,
+        },
+        'mmlu_biology': {
+            'sources': [('cais/mmlu', 'college_biology'), ('cais/mmlu', 'high_school_biology')],
+            'split': 'test',
+            'shuffle': False,
+        },
+    }
+    
+    # Number of leading examples a streamed split is reservoir-sampled from
+    _STREAM_POOL_SIZE = 10000
+    
     def __init__(self, cache_dir: str = './data/datasets'):
         self.cache_dir = cache_dir
+        # Loaded DatasetDicts keyed by (name, config, streaming) so repeated loads skip Arrow re-parsing
+        self._ds_cache: Dict[Tuple[str, Optional[str], bool], Any] = {}
     
-    def load_fever(self, split: str = 'validation', num_samples: int = 50):
-        """Load FEVER dataset."""
-        try:
-            # Try loading FEVER from different sources
-            try:
-                dataset = load_dataset('fever', cache_dir=self.cache_dir)
-                logger.info("Loaded FEVER dataset")
-            except Exception as e1:
-                logger.warning(f"FEVER dataset not available ({str(e1)}), trying alternative")
+    def _is_downloaded(self, name: str, config: Optional[str]) -> bool:
+        """Whether this (name, config) already has a copy in the HF cache layout under cache_dir."""
+        return os.path.isdir(os.path.join(self.cache_dir, name.replace('/', '___'), config or 'default'))
+    
+    def _get(self, name: str, config: Optional[str] = None, streaming: bool = False):
+        """Load a HuggingFace dataset, reusing the in-memory copy when available.
+        
+        Configs already downloaded are loaded from local files first, skipping the
+        Hub round-trips load_dataset otherwise makes.
+        """
+        key = (name, config, streaming)
+        if key not in self._ds_cache:
+            from datasets import DownloadConfig, load_dataset
+            dataset = None
+            if not streaming and self._is_downloaded(name, config):
                 try:
-                    # Use a fact-checking dataset as substitute
-                    dataset = load_dataset('tweet_eval', 'stance_climate', cache_dir=self.cache_dir)
-                    logger.info("Using tweet_eval/stance_climate as FEVER substitute")
-                except Exception as e2:
-                    logger.error(f"Alternative dataset also failed: {str(e2)}")
-                    raise
-            
-            available_splits = list(dataset.keys())
-            if split not in available_splits:
-                split = available_splits[0] if available_splits else 'validation'
-            max_samples = min(num_samples, len(dataset[split]))
-            samples = dataset[split].shuffle(seed=42).select(range(max_samples))
-            logger.info(f"Loaded {len(samples)} samples from dataset {split} split")
-            return samples
-        except Exception as e:
-            logger.error(f"Failed to load FEVER dataset: {str(e)}")
-            raise
+                    dataset = load_dataset(
+                        name, config, cache_dir=self.cache_dir,
+                        download_config=DownloadConfig(local_files_only=True)
+                    )
+                    logger.debug(f"Loaded {name} ({config}) from local files")
+                except Exception as e:
+                    logger.debug(f"Offline load of {name} ({config}) failed ({str(e)}), using the Hub")
+            if dataset is None:
+                dataset = load_dataset(
+                    name, config, cache_dir=self.cache_dir, streaming=streaming
+                )
+            self._ds_cache[key] = dataset
+        else:
+            logger.debug(f"Using cached dataset {name} ({config})")
+        return self._ds_cache[key]
     
-    def load_hotpotqa(self, split: str = 'validation', num_samples: int = 50):
-        """Load HotpotQA dataset."""
-        try:
-            dataset = load_dataset('hotpot_qa', 'distractor', cache_dir=self.cache_dir)
-            available_splits = list(dataset.keys())
-            if split not in available_splits:
-                split = available_splits[0] if available_splits else 'validation'
-            samples = dataset[split].shuffle(seed=42).select(range(min(num_samples, len(dataset[split]))))
-            logger.info(f"Loaded {len(samples)} samples from HotpotQA {split}")
-            return samples
-        except Exception as e:
-            logger.error(f"Failed to load HotpotQA dataset: {str(e)}")
-            raise
+    def _sample(self, split_dataset, num_samples: int, seed: int = 42):
+        """Draw a reproducible random subset without shuffling the whole split.
+        
+        Sorted indices keep Arrow reads contiguous and avoid building a
+        full-length indices mapping.
+        """
+        rng = np.random.default_rng(seed)
+        n = min(num_samples, len(split_dataset))
+        idx = np.sort(rng.choice(len(split_dataset), n, replace=False))
+        return split_dataset.select(idx.tolist())
     
-    def load_medmcqa(self, split: str = 'validation', num_samples: int = 50):
-        """Load MedMCQA dataset. Use validation split as test split doesn't have labels."""
-        try:
-            dataset = load_dataset('medmcqa', cache_dir=self.cache_dir)
-            available_splits = list(dataset.keys())
-            # Prefer validation over test (test split has cop=-1, no labels)
-            if 'validation' in available_splits:
-                split = 'validation'
-            elif split not in available_splits:
-                split = available_splits[0] if available_splits else 'validation'
-            samples = dataset[split].shuffle(seed=42).select(range(min(num_samples, len(dataset[split]))))
-            logger.info(f"Loaded {len(samples)} samples from MedMCQA {split}")
-            return samples
-        except Exception as e:
-            logger.error(f"Failed to load MedMCQA dataset: {str(e)}")
-            raise
+    def _sample_stream(self, split_stream, num_samples: int, seed: int = 42):
+        """Reservoir-sample a reproducible subset from a streamed split.
+        
+        Only the first _STREAM_POOL_SIZE examples are read, so the full split
+        is never downloaded or materialized.
+        """
+        from datasets import Dataset
+        rng = random.Random(seed)
+        reservoir = []
+        for i, example in enumerate(split_stream.take(self._STREAM_POOL_SIZE)):
+            if i < num_samples:
+                reservoir.append((i, example))
+            else:
+                j = rng.randint(0, i)
+                if j < num_samples:
+                    reservoir[j] = (i, example)
+        # Keep stream order so the subset is stable regardless of replacement order
+        reservoir.sort(key=lambda item: item[0])
+        return Dataset.from_list([example for _, example in reservoir])
     
-    def load_mmlu_physics(self, num_samples: int = 30):
-        """Load MMLU Physics subset."""
-        try:
-            # Try college_physics first, fallback to high_school_physics
+    def _subset_path(self, name: str, num_samples: int, shuffle: bool = True, seed: int = 42) -> str:
+        """Location of the on-disk copy of a sampled subset."""
+        order = f"seed{seed}" if shuffle else "head"
+        return os.path.join(self.cache_dir, 'subsets', f"{name}_{num_samples}_{order}")
+    
+    def load(self, name: str, num_samples: int = 50):
+        """Load a reproducible random subset of a benchmark dataset.
+        
+        Args:
+            name: Dataset name (fever, hotpotqa, medmcqa, mmlu_physics, mmlu_biology)
+            num_samples: Number of samples to draw
+        
+        Returns:
+            HuggingFace Dataset with the selected samples
+        """
+        if name not in self._DATASETS:
+            raise ValueError(f"Unknown dataset: {name}")
+        spec = self._DATASETS[name]
+        streaming = spec.get('streaming', False)
+        shuffle = spec.get('shuffle', True)
+        
+        # The subset is fixed for a given (name, num_samples, seed), so reuse it when saved
+        subset_path = self._subset_path(name, num_samples, shuffle)
+        if os.path.isdir(subset_path):
+            from datasets import Dataset
             try:
-                dataset = load_dataset('cais/mmlu', 'college_physics', cache_dir=self.cache_dir)
-                logger.info("Using MMLU college_physics")
-            except:
-                dataset = load_dataset('cais/mmlu', 'high_school_physics', cache_dir=self.cache_dir)
-                logger.info("Using MMLU high_school_physics")
+                samples = Dataset.load_from_disk(subset_path)
+                logger.info(f"Loaded {len(samples)} samples for {name} from {subset_path}")
+                return samples
+            except Exception as e:
+                logger.warning(f"Could not read saved subset {subset_path} ({str(e)}), resampling")
+        
+        try:
+            dataset = self._load_first_available(name, spec['sources'], streaming)
             
             available_splits = list(dataset.keys())
-            split = 'test' if 'test' in available_splits else available_splits[0]
-            samples = dataset[split].shuffle(seed=42).select(range(min(num_samples, len(dataset[split]))))
-            logger.info(f"Loaded {len(samples)} samples from MMLU Physics")
-            return samples
+            split = spec['split']
+            if split not in available_splits:
+                split = available_splits[0] if available_splits else split
+            if streaming:
+                samples = self._sample_stream(dataset[split], num_samples)
+            elif not shuffle:
+                samples = dataset[split].select(range(min(num_samples, len(dataset[split]))))
+            else:
+                samples = self._sample(dataset[split], num_samples)
+            logger.info(f"Loaded {len(samples)} samples from {name} {split} split")
         except Exception as e:
-            logger.error(f"Failed to load MMLU Physics dataset: {str(e)}")
+            logger.error(f"Failed to load {name} dataset: {str(e)}")
             raise
-    
-    def load_mmlu_biology(self, num_samples: int = 30):
-        """Load MMLU Biology subset."""
+        
         try:
-            # Try college_biology first, fallback to high_school_biology
-            try:
-                dataset = load_dataset('cais/mmlu', 'college_biology', cache_dir=self.cache_dir)
-                logger.info("Using MMLU college_biology")
-            except:
-                dataset = load_dataset('cais/mmlu', 'high_school_biology', cache_dir=self.cache_dir)
-                logger.info("Using MMLU high_school_biology")
-            
-            available_splits = list(dataset.keys())
-            split = 'test' if 'test' in available_splits else available_splits[0]
-            samples = dataset[split].shuffle(seed=42).select(range(min(num_samples, len(dataset[split]))))
-            logger.info(f"Loaded {len(samples)} samples from MMLU Biology")
-            return samples
+            samples.save_to_disk(subset_path)
         except Exception as e:
-            logger.error(f"Failed to load MMLU Biology dataset: {str(e)}")
-            raise
-
+            logger.warning(f"Could not save subset to {subset_path}: {str(e)}")
+        return samples
+    
+    def _load_first_available(self, name: str, sources, streaming: bool = False):
+        """Load the first available (hf_name, config) source, falling back in order."""
+        last_error = None
+        for hf_name, config in sources:
+            try:
+                dataset = self._get(hf_name, config, streaming=streaming)
+                source_label = f"{hf_name}/{config}" if config else hf_name
+                logger.info(f"Using {source_label} for {name}")
+                return dataset
+            except Exception as e:
+                logger.warning(f"{hf_name} not available ({str(e)}), trying alternative")
+                last_error = e
+        raise last_error
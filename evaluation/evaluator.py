@@ -1,17 +1,166 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import logging
 import os
 import json
+import orjson
+import queue
+import random
 import re
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from functools import lru_cache, partial
+from itertools import islice
 from tqdm import tqdm
-from difflib import SequenceMatcher
+from rapidfuzz import fuzz
+from config.settings import config
 from evaluation.benchmark_datasets import DatasetManager
-from evaluation.metrics import accuracy, exact_match
+from evaluation.response_cache import CachedCoK
+from src.utils.disk_cache import DiskCache
+from src.utils.prompt_templates import BATCH_ANSWER_PROMPT_TEMPLATE
+from src.utils.rate_limiter import AdaptiveRateLimiter
 
 logger = logging.getLogger(__name__)
 
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_MMLU_LETTER_RE = re.compile(r'\b([ABCD])\b')
+_MMLU_LETTER_LOW_RE = re.compile(r'\b([abcd])\b')
+# Full and partial FEVER labels (REFUTE/SUPPORT also match inside longer words)
+_FEVER_LABEL_RE = re.compile(r'REFUTES?|SUPPORTS?|NOT ENOUGH INFO')
+
+def _keywords_re(keywords) -> re.Pattern:
+    """Compile keywords into one alternation that finds any of them in a single scan."""
+    return re.compile('|'.join(map(re.escape, keywords)))
+
+def _distinct_keywords_re(keywords) -> re.Pattern:
+    """Compile keywords so findall returns every (possibly overlapping) occurrence."""
+    return re.compile('(?=(' + '|'.join(map(re.escape, keywords)) + '))')
+
+# Synonyms accepted for each FEVER gold label when scoring
+_FEVER_SYNONYM_RES = {
+    'supports': _keywords_re(['support', 'true', 'correct', 'yes', 'agree', 'valid', 'accurate', 'affirm', 'confirm', 'verify']),
+    'refutes': _keywords_re(['refute', 'false', 'incorrect', 'no', 'wrong', 'disagree', 'invalid', 'inaccurate', 'dispute', 'contradict', 'deny', 'reject', 'disprove']),
+    'not enough info': _keywords_re(['not enough', 'insufficient', 'unknown', 'unclear', 'cannot determine', 'need more', 'lack of information', 'no information', 'inconclusive', 'uncertain']),
+}
+
+# Keywords counted per label when a FEVER prediction has no explicit label
+_REFUTE_KEYWORDS_RE = _distinct_keywords_re(['refute', 'false', 'incorrect', 'wrong', 'disagree', 'contradict', 'deny', 'reject', 'disprove', 'inaccurate'])
+_SUPPORT_KEYWORDS_RE = _distinct_keywords_re(['support', 'true', 'correct', 'yes', 'agree', 'valid', 'accurate', 'affirm', 'confirm', 'verify'])
+_INFO_KEYWORDS_RE = _distinct_keywords_re(['not enough', 'insufficient', 'unknown', 'unclear', 'cannot determine', 'inconclusive', 'uncertain'])
+
+# Per-dataset results written after each dataset completes in evaluate_all
+_INCREMENTAL_PREFIX = 'evaluation_incremental_'
+
+# Numbered answers in a batched reply, e.g. "1. B" / "A2: Paris"
+_BATCH_ANSWER_RE = re.compile(
+    r'^\s*(?:Q|A)?\s*(\d+)[.:)]\s*(.+?)(?=\n\s*(?:Q|A)?\s*\d+[.:)]|\Z)',
+    re.MULTILINE | re.DOTALL
+)
+
+def _column(samples, name: str, default=None) -> List:
+    """Read a whole column at once (or defaults if the dataset lacks it)."""
+    if name in samples.column_names:
+        return samples[name]
+    return [default] * len(samples)
+
+def _fever_questions(samples) -> List[str]:
+    """Format FEVER claims as questions."""
+    # Try 'claim' first (FEVER), then 'text' (tweet_eval fallback)
+    column = 'claim' if 'claim' in samples.column_names else 'text'
+    return [f"Claim: {claim}" for claim in samples[column]]
+
+def _fever_label(label) -> str:
+    """Normalize a FEVER label, mapping tweet_eval stance labels to FEVER format."""
+    if label is None:
+        return 'UNKNOWN'
+    # Convert to string and normalize
+    label_str = str(label).upper()
+    # Map tweet_eval labels (0=AGAINST, 1=FAVOR, 2=NONE) to FEVER format
+    if label_str in ['0', 'AGAINST', 'REFUTES']:
+        return 'REFUTES'
+    elif label_str in ['1', 'FAVOR', 'SUPPORTS']:
+        return 'SUPPORTS'
+    elif label_str in ['2', 'NONE', 'NOT ENOUGH INFO']:
+        return 'NOT ENOUGH INFO'
+    # If already in FEVER format, return as is
+    return label_str
+
+_MEDMCQA_OPTS = ('opa', 'opb', 'opc', 'opd')
+_MMLU_LETTERS = ('A', 'B', 'C', 'D')
+
+def _medmcqa_option(cop, options, exp) -> str:
+    """Resolve MedMCQA correct option index to its option text."""
+    # MedMCQA uses 'cop' field (correct option: 0, 1, 2, or 3) which maps to opa, opb, opc, opd
+    if cop == -1:
+        # Fallback to 'exp' if cop is not available
+        if exp:
+            return str(exp)
+        return ''
+    if 0 <= cop <= 3:
+        return str(options[cop])
+    return ''
+
+def _mmlu_letter(answer) -> str:
+    """Convert MMLU answer to option letter."""
+    # MMLU answer can be int (0-3) or string (A-D), convert to string
+    if answer is None:
+        return 'UNKNOWN'
+    # Convert to string, handle both int and string formats
+    if isinstance(answer, int):
+        # Map 0-3 to A-D
+        if 0 <= answer < len(_MMLU_LETTERS):
+            return _MMLU_LETTERS[answer]
+        return chr(65 + answer)
+    return str(answer).upper().strip()
+
+def _medmcqa_gold_labels(samples) -> List[str]:
+    """Extract MedMCQA gold option texts."""
+    options = zip(*(_column(samples, key, '') for key in _MEDMCQA_OPTS))
+    return [
+        _medmcqa_option(cop, opts, exp)
+        for cop, opts, exp in zip(_column(samples, 'cop', -1), options, _column(samples, 'exp', ''))
+    ]
+
+def _mmlu_gold_labels(samples) -> List[str]:
+    """Extract MMLU gold option letters."""
+    column = 'answer' if 'answer' in samples.column_names else 'correct'
+    return [_mmlu_letter(answer) for answer in _column(samples, column)]
+
+# Per-dataset extractors working on whole columns, so rows are never decoded into dicts
+_Q_EXTRACTORS = {
+    'fever': _fever_questions,
+    'hotpotqa': lambda samples: list(samples['question']),
+    'medmcqa': lambda samples: list(samples['question']),
+    'mmlu_physics': lambda samples: list(samples['question']),
+    'mmlu_biology': lambda samples: list(samples['question']),
+}
+
+_G_EXTRACTORS = {
+    'fever': lambda samples: [_fever_label(label) for label in _column(samples, 'label')],
+    'hotpotqa': lambda samples: [str(answer) for answer in samples['answer']],
+    'medmcqa': _medmcqa_gold_labels,
+    'mmlu_physics': _mmlu_gold_labels,
+    'mmlu_biology': _mmlu_gold_labels,
+}
+
+# Memoized so repeated gold labels (common in multiple-choice sets) are cleaned once
+@lru_cache(maxsize=4096)
+def _clean(text: str) -> str:
+    """Remove punctuation from already-lowercased text."""
+    return _PUNCT_RE.sub('', text)
+
+@lru_cache(maxsize=4096)
+def _tokens(text: str) -> frozenset:
+    """Split cleaned text into a set of words."""
+    return frozenset(text.split())
+
+def _similar(a: str, b: str, threshold: float) -> bool:
+    """Check fuzzy similarity ratio > threshold (0-1 scale)."""
+    # score_cutoff lets rapidfuzz stop early once the threshold is out of reach
+    cutoff = threshold * 100
+    return fuzz.ratio(a, b, score_cutoff=cutoff) > cutoff
+
 class CoKEvaluator:
     """Evaluate Chain-of-Knowledge pipeline on benchmark datasets."""
     
@@ -19,69 +168,110 @@ class CoKEvaluator:
         self.cok_model = cok_model
         self.dataset_manager = dataset_manager
         self.results = []
+        # Create the results directory once rather than on every save
+        self.results_dir = config.RESULTS_DIR
+        self.checkpoint_dir = os.path.join(self.results_dir, '.checkpoints')
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        # Opt-in on-disk answer cache (COK_CACHE=1) so re-runs skip repeated API calls
+        self.cached_cok = None
+        if config.RESPONSE_CACHE_ENABLED:
+            llm_client = getattr(cok_model, 'llm_client', None)
+            model_id = getattr(llm_client, 'model', config.TOGETHER_MODEL)
+            self.cached_cok = CachedCoK(cok_model, DiskCache(config.RESPONSE_CACHE_DIR), model_id)
+            logger.info(f"Response cache enabled at {config.RESPONSE_CACHE_DIR}")
     
-    def evaluate_dataset(self, dataset_name: str, num_samples: int = 50) -> Dict:
+    def evaluate_dataset(self, dataset_name: str, num_samples: int = 50, samples=None,
+                         batch_size: int = None, use_cache: bool = True) -> Dict:
         """Evaluate CoK on specific dataset.
         
         Args:
             dataset_name: Name of dataset (fever, hotpotqa, medmcqa, mmlu_physics, mmlu_biology)
             num_samples: Number of samples to evaluate
+            samples: Optional pre-loaded samples (skips loading the dataset)
+            batch_size: Questions answered per LLM call (default: config.EVAL_BATCH_SIZE).
+                Values above 1 answer directly without the CoK pipeline; ignored for FEVER.
+            use_cache: Serve answers from the response cache when it is enabled
         
         Returns:
             Dict with evaluation metrics
         """
         logger.info(f"Evaluating on {dataset_name} ({num_samples} samples)")
         
-        # Load dataset
-        if dataset_name == 'fever':
-            samples = self.dataset_manager.load_fever(num_samples=num_samples)
-        elif dataset_name == 'hotpotqa':
-            samples = self.dataset_manager.load_hotpotqa(num_samples=num_samples)
-        elif dataset_name == 'medmcqa':
-            samples = self.dataset_manager.load_medmcqa(num_samples=num_samples)
-        elif dataset_name == 'mmlu_physics':
-            samples = self.dataset_manager.load_mmlu_physics(num_samples=num_samples)
-        elif dataset_name == 'mmlu_biology':
-            samples = self.dataset_manager.load_mmlu_biology(num_samples=num_samples)
-        else:
+        # Retrieved knowledge is memoized per pipeline; start each evaluation run fresh
+        query_generator = getattr(self.cok_model, 'query_generator', None)
+        if query_generator is not None:
+            query_generator.clear_query_cache()
+        
+        # Load dataset (unless already prefetched)
+        if samples is None:
+            samples = self.dataset_manager.load(dataset_name, num_samples)
+        
+        if dataset_name not in _Q_EXTRACTORS:
             raise ValueError(f"Unknown dataset: {dataset_name}")
+        questions = _Q_EXTRACTORS[dataset_name](samples)
+        gold_labels = _G_EXTRACTORS[dataset_name](samples)
+        predictions = [""] * len(questions)
         
-        predictions = []
-        gold_labels = []
+        # Per-sample checkpoint so an interrupted run resumes where it stopped
+        progress_path = os.path.join(self.checkpoint_dir, f"{dataset_name}_{num_samples}.jsonl")
+        # Records are tied to their sample's content, so a changed subset is re-run
+        fingerprints = [DiskCache.make_key(q, g) for q, g in zip(questions, gold_labels)]
+        completed = self._load_progress(progress_path, fingerprints)
+        for i, prediction in completed.items():
+            predictions[i] = prediction
+        pending = [i for i in range(len(questions)) if i not in completed]
+        if completed:
+            logger.info(f"Resuming {dataset_name}: {len(questions) - len(pending)} samples already completed")
         
-        # Run inference
-        for i, sample in enumerate(tqdm(samples, desc=f"Evaluating {dataset_name}")):
-            question = self._extract_question(sample, dataset_name)
-            gold_label = self._extract_gold_label(sample, dataset_name)
-            
-            try:
-                # Run CoK
-                result = self.cok_model.run(question)
-                prediction = result['answer']
-                
-                # Post-process prediction based on dataset type
-                prediction = self._post_process_prediction(prediction, dataset_name)
-                
-                predictions.append(prediction)
-                gold_labels.append(gold_label)
-                
-                # Rate limiting: add delay between API calls (longer for full pipeline)
-                # FEVER runs full pipeline so needs more time
-                if dataset_name == 'fever':
-                    time.sleep(3)  # 3 seconds for FEVER (full pipeline)
-                else:
-                    time.sleep(2)  # 2 seconds for others
-                
-                logger.debug(f"Sample {i+1}: Q={question[:50]}... Pred={prediction[:50]}... Gold={gold_label[:50]}...")
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"Error processing sample {i+1}: {error_msg}")
-                # If rate limit, wait a bit before continuing
-                if 'rate_limit' in error_msg.lower() or '429' in error_msg:
-                    logger.warning("Rate limit detected, waiting 60 seconds...")
-                    time.sleep(60)
-                predictions.append("")
-                gold_labels.append(gold_label)
+        # FEVER claims always go through the full per-claim pipeline
+        if batch_size is None:
+            batch_size = config.EVAL_BATCH_SIZE
+        if dataset_name == 'fever':
+            batch_size = 1
+        units = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        
+        cache = self.cached_cok if use_cache else None
+        if cache is not None:
+            hits_before, misses_before = cache.hits, cache.misses
+        
+        # Run inference concurrently - each unit is dominated by blocking LLM API calls.
+        # Submissions are bounded so only a small window of units is in flight at once.
+        window = 2 * config.EVAL_PARALLELISM
+        # Full pipeline runs (FEVER) make more API calls, so space them further apart
+        limiter = AdaptiveRateLimiter(min_interval=3.0 if dataset_name == 'fever' else 2.0)
+        unit_iter = iter(units)
+        with ThreadPoolExecutor(max_workers=config.EVAL_PARALLELISM) as executor, \
+                open(progress_path, 'a') as progress_file, \
+                tqdm(total=len(pending), desc=f"Evaluating {dataset_name}") as progress_bar:
+            in_flight = {}
+            failed = 0
+            for unit in islice(unit_iter, window):
+                in_flight[executor.submit(self._run_unit, unit, questions, limiter, dataset_name, cache)] = unit
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    unit = in_flight.pop(future)
+                    for i, (answer, prediction) in zip(unit, future.result()):
+                        predictions[i] = prediction
+                        logger.debug(f"Sample {i+1}: Q={questions[i][:50]}... Pred={prediction[:50]}... Gold={gold_labels[i][:50]}...")
+                        
+                        # Failed samples are not recorded so they are retried on resume
+                        if answer:
+                            progress_file.write(json.dumps({'i': i, 'pred': prediction, 'gold': gold_labels[i], 'key': fingerprints[i]}) + '\n')
+                        else:
+                            failed += 1
+                    # Make completed samples durable before moving on
+                    progress_file.flush()
+                    os.fsync(progress_file.fileno())
+                    progress_bar.update(len(unit))
+                    
+                    # Refill the window as slots free up
+                    for next_unit in islice(unit_iter, 1):
+                        in_flight[executor.submit(self._run_unit, next_unit, questions, limiter, dataset_name, cache)] = next_unit
+        
+        # Keep the checkpoint only while some samples still need retrying
+        if failed == 0:
+            os.remove(progress_path)
         
         # Calculate metrics (only on successfully processed samples)
         if predictions:
@@ -97,12 +287,97 @@ class CoKEvaluator:
             'predictions': predictions,
             'gold_labels': gold_labels
         }
+        if cache is not None:
+            result_dict['cache_hits'] = cache.hits - hits_before
+            result_dict['cache_misses'] = cache.misses - misses_before
         
         logger.info(f"{dataset_name}: {metric:.2f}% ({len(predictions)} samples processed)")
         self.results.append(result_dict)
         
         return result_dict
     
+    def _run_unit(self, unit: List[int], questions: List[str], limiter: AdaptiveRateLimiter,
+                  dataset_name: str, cache: Optional[CachedCoK]) -> List[Tuple[str, str]]:
+        """Answer one unit of work (a single sample, or a batch).
+        
+        Returns one (raw answer, post-processed prediction) pair per index. Post-processing
+        runs here on the worker so the main thread only records results.
+        Batched units always call the LLM; the response cache only covers single CoK runs.
+        """
+        if len(unit) == 1:
+            answers = [self._run_one(unit[0], questions[unit[0]], limiter, dataset_name, cache)]
+        else:
+            answers = self._batch_run(unit, [questions[i] for i in unit], limiter)
+        # Post-process prediction based on dataset type
+        return [(answer, self._post_process_prediction(answer, dataset_name)) for answer in answers]
+    
+    def _run_one(self, i: int, question: str, limiter: AdaptiveRateLimiter,
+                 dataset_name: str, cache: Optional[CachedCoK]) -> str:
+        """Run CoK on a single sample, returning an empty prediction on failure."""
+        if cache is not None:
+            # Cache hits make no API call, so they bypass the rate limiter
+            cached = cache.lookup(question, dataset_name)
+            if cached is not None:
+                return cached
+            run_question = partial(cache.run_uncached, dataset_name=dataset_name)
+        else:
+            run_question = self.cok_model.run
+        answer = self._call_with_retries(
+            f"sample {i+1}", lambda: run_question(question)['answer'], limiter
+        )
+        return answer if answer is not None else ""
+    
+    def _batch_run(self, indices: List[int], questions: List[str], limiter: AdaptiveRateLimiter) -> List[str]:
+        """Answer several questions with one LLM call.
+        
+        Answers missing from the reply come back empty, so those samples are retried on resume.
+        """
+        numbered = "\n\n".join(f"Q{n}. {question}" for n, question in enumerate(questions, 1))
+        prompt = BATCH_ANSWER_PROMPT_TEMPLATE.format(questions=numbered)
+        label = f"samples {indices[0]+1}-{indices[-1]+1}"
+        response = self._call_with_retries(
+            label,
+            lambda: self.cok_model.llm_client.call(prompt, temperature=config.CONSOLIDATION_TEMPERATURE),
+            limiter
+        )
+        answers = [""] * len(questions)
+        if response is None:
+            return answers
+        for match in _BATCH_ANSWER_RE.finditer(response):
+            n = int(match.group(1))
+            if 1 <= n <= len(questions):
+                answers[n - 1] = match.group(2).strip()
+        missing = answers.count("")
+        if missing:
+            logger.warning(f"Batched reply for {label} was missing {missing} answers")
+        return answers
+    
+    def _call_with_retries(self, label: str, call, limiter: AdaptiveRateLimiter):
+        """Run an API-bound call under the rate limiter, returning None on failure.
+        
+        Rate-limit errors are retried with exponential backoff; other errors are not.
+        """
+        for attempt in range(config.EVAL_MAX_RETRIES + 1):
+            limiter.acquire()
+            try:
+                result = call()
+                limiter.on_success()
+                return result
+            except Exception as e:
+                error_msg = str(e)
+                if 'rate_limit' not in error_msg.lower() and '429' not in error_msg:
+                    logger.error(f"Error processing {label}: {error_msg}")
+                    return None
+                limiter.on_rate_limit()
+                if attempt == config.EVAL_MAX_RETRIES:
+                    logger.error(f"{label} still rate limited after {attempt} retries: {error_msg}")
+                    return None
+                # Back off only this unit; jitter keeps workers from retrying in lockstep
+                delay = min(60.0, 5.0 * 2 ** attempt) * random.uniform(0.8, 1.2)
+                logger.warning(f"Rate limit on {label}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+        return None
+    
     def evaluate_all(self, num_samples_per_dataset: int = 50, resume: bool = True) -> Dict:
         """Evaluate on all datasets."""
         datasets = ['fever', 'hotpotqa', 'medmcqa', 'mmlu_physics', 'mmlu_biology']
@@ -119,115 +394,113 @@ class CoKEvaluator:
                 datasets = [d for d in datasets if d not in existing_results]
                 logger.info(f"Resuming with remaining datasets: {datasets}")
         
+        # Load the next dataset in the background while the current one is evaluated
+        prefetched = queue.Queue(maxsize=1)
+        loader = threading.Thread(
+            target=self._prefetch_datasets,
+            args=(datasets, num_samples_per_dataset, prefetched),
+            daemon=True
+        )
+        loader.start()
+        
         for dataset_name in datasets:
             try:
-                all_results[dataset_name] = self.evaluate_dataset(dataset_name, num_samples_per_dataset)
-                # Save incrementally after each dataset
-                self._save_results(all_results, incremental=True)
+                samples, load_error = prefetched.get()
+                if load_error is not None:
+                    raise load_error
+                all_results[dataset_name] = self.evaluate_dataset(
+                    dataset_name, num_samples_per_dataset, samples=samples
+                )
+                # Save incrementally after each dataset (only the new dataset is written)
+                self._save_dataset_result(dataset_name, all_results[dataset_name])
             except Exception as e:
+                # Completed datasets are already saved individually
                 logger.error(f"Failed to evaluate {dataset_name}: {str(e)}")
-                logger.info("Saving partial results...")
-                self._save_results(all_results, incremental=True)
                 raise
         
         self._print_summary(all_results)
-        self._save_results(all_results, incremental=False)
+        self._save_results(all_results)
         
         return all_results
     
+    def _prefetch_datasets(self, datasets: List[str], num_samples: int, out_queue: queue.Queue):
+        """Load datasets in order, putting (samples, error) pairs on out_queue."""
+        for dataset_name in datasets:
+            try:
+                out_queue.put((self.dataset_manager.load(dataset_name, num_samples), None))
+            except Exception as e:
+                out_queue.put((None, e))
+    
+    def _load_progress(self, path: str, fingerprints: List[str]) -> Dict[int, str]:
+        """Load per-sample predictions from a progress file, keyed by sample index.
+        
+        Records whose fingerprint doesn't match the current sample at that index
+        (e.g. the dataset subset changed since the checkpoint) are ignored.
+        """
+        completed = {}
+        if not os.path.exists(path):
+            return completed
+        stale = 0
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    i = record['i']
+                    if not 0 <= i < len(fingerprints) or record.get('key') != fingerprints[i]:
+                        stale += 1
+                        continue
+                    completed[i] = record['pred']
+                except (ValueError, KeyError, TypeError):
+                    # Partially written line from an interrupted run
+                    continue
+        if stale:
+            logger.warning(f"Ignoring {stale} checkpoint records that don't match the current samples")
+        return completed
+    
     def _load_latest_results(self) -> Dict:
-        """Load latest results file if it exists."""
-        import glob
-        json_files = glob.glob(os.path.join('./data/results', "evaluation_*.json"))
-        if not json_files:
-            return {}
+        """Load the latest aggregate results plus any per-dataset results saved after it."""
+        aggregate = None
+        incremental = []
+        # One directory pass; DirEntry caches its stat result
+        with os.scandir(self.results_dir) as entries:
+            for entry in entries:
+                if not (entry.name.startswith('evaluation_') and entry.name.endswith('.json')):
+                    continue
+                if entry.name.startswith(_INCREMENTAL_PREFIX):
+                    incremental.append(entry)
+                elif aggregate is None or entry.stat().st_mtime > aggregate.stat().st_mtime:
+                    aggregate = entry
         
-        latest_file = max(json_files, key=os.path.getctime)
+        results = {}
+        since = 0.0
+        if aggregate is not None:
+            results.update(self._read_results(aggregate.path))
+            since = aggregate.stat().st_mtime
+        # Per-dataset files older than the aggregate belong to an earlier, finished run
+        for entry in incremental:
+            if entry.stat().st_mtime >= since:
+                dataset_result = self._read_results(entry.path)
+                if dataset_result:
+                    results[entry.name[len(_INCREMENTAL_PREFIX):-len('.json')]] = dataset_result
+        return results
+    
+    def _read_results(self, path: str) -> Dict:
+        """Read a results file, returning an empty dict if it cannot be loaded."""
         try:
-            with open(latest_file, 'r') as f:
-                results = json.load(f)
-                logger.info(f"Loaded existing results from {latest_file}")
-                return results
+            with open(path, 'rb') as f:
+                results = orjson.loads(f.read())
+            logger.info(f"Loaded existing results from {path}")
+            return results
         except Exception as e:
-            logger.warning(f"Could not load existing results: {str(e)}")
+            logger.warning(f"Could not load existing results from {path}: {str(e)}")
             return {}
     
-    def _extract_question(self, sample: Dict, dataset_name: str) -> str:
-        """Extract question from sample."""
-        if dataset_name == 'fever':
-            # Try 'claim' first (FEVER), then 'text' (tweet_eval fallback)
-            claim = sample.get('claim', sample.get('text', str(sample)))
-            # Format as FEVER-style question
-            return f"Claim: {claim}"
-        elif dataset_name == 'hotpotqa':
-            return sample['question']
-        elif dataset_name == 'medmcqa':
-            return sample['question']
-        elif dataset_name in ['mmlu_physics', 'mmlu_biology']:
-            return sample['question']
-        else:
-            raise ValueError(f"Unknown dataset: {dataset_name}")
-    
-    def _extract_gold_label(self, sample: Dict, dataset_name: str) -> str:
-        """Extract gold label from sample."""
-        if dataset_name == 'fever':
-            # Try 'label' field
-            label = sample.get('label', None)
-            if label is None:
-                return 'UNKNOWN'
-            # Convert to string and normalize
-            label_str = str(label).upper()
-            # Map tweet_eval labels (0=AGAINST, 1=FAVOR, 2=NONE) to FEVER format
-            if label_str in ['0', 'AGAINST', 'REFUTES']:
-                return 'REFUTES'
-            elif label_str in ['1', 'FAVOR', 'SUPPORTS']:
-                return 'SUPPORTS'
-            elif label_str in ['2', 'NONE', 'NOT ENOUGH INFO']:
-                return 'NOT ENOUGH INFO'
-            # If already in FEVER format, return as is
-            return label_str
-        elif dataset_name == 'hotpotqa':
-            return str(sample['answer'])
-        elif dataset_name == 'medmcqa':
-            # MedMCQA uses 'cop' field (correct option: 0, 1, 2, or 3) which maps to opa, opb, opc, opd
-            cop = sample.get('cop', -1)
-            if cop == -1:
-                # Fallback to 'exp' if cop is not available
-                exp = sample.get('exp', '')
-                if exp:
-                    return str(exp)
-                return ''
-            # Map 0-3 to A-D, then get the actual option text
-            option_map = {0: 'opa', 1: 'opb', 2: 'opc', 3: 'opd'}
-            if cop in option_map:
-                option_key = option_map[cop]
-                return str(sample.get(option_key, ''))
-            return ''
-        elif dataset_name in ['mmlu_physics', 'mmlu_biology']:
-            # MMLU answer can be int (0-3) or string (A-D), convert to string
-            answer = sample.get('answer', sample.get('correct', None))
-            if answer is None:
-                return 'UNKNOWN'
-            # Convert to string, handle both int and string formats
-            if isinstance(answer, int):
-                # Map 0-3 to A-D
-                return chr(65 + answer)  # 0->A, 1->B, 2->C, 3->D
-            return str(answer).upper().strip()
-        else:
-            raise ValueError(f"Unknown dataset: {dataset_name}")
-    
     def _calculate_metric(self, dataset_name: str, predictions: List[str], gold_labels: List[str]) -> float:
         """Calculate appropriate metric for dataset with improved matching."""
-        if dataset_name == 'fever':
-            return self._calculate_fever_accuracy(predictions, gold_labels)
-        elif dataset_name == 'hotpotqa':
-            return self._calculate_hotpotqa_accuracy(predictions, gold_labels)
-        elif dataset_name == 'medmcqa':
-            return self._calculate_medmcqa_accuracy(predictions, gold_labels)
-        elif dataset_name in ['mmlu_physics', 'mmlu_biology']:
-            return self._calculate_mmlu_accuracy(predictions, gold_labels)
-        else:
+        metric_fn = self._METRIC_FNS.get(dataset_name)
+        if metric_fn is None:
             raise ValueError(f"Unknown dataset: {dataset_name}")
+        return metric_fn(self, predictions, gold_labels)
     
     def _calculate_fever_accuracy(self, predictions: List[str], gold_labels: List[str]) -> float:
         """Calculate FEVER accuracy - extract label from prediction."""
@@ -237,6 +510,7 @@ class CoKEvaluator:
             pred_lower = pred.lower()
             gold_upper = gold.upper()
             gold_lower = gold.lower()
+            synonyms = _FEVER_SYNONYM_RES.get(gold_lower)
             
             # Check for exact label match (case-insensitive)
             if gold_upper in pred_upper or gold_lower in pred_lower:
@@ -244,14 +518,8 @@ class CoKEvaluator:
             # Check for partial matches (e.g., "REFUTE" in "REFUTES")
             elif any(gold_word in pred_upper for gold_word in gold_upper.split() if len(gold_word) > 3):
                 correct += 1
-            # Check for synonyms - SUPPORTS
-            elif gold_lower == 'supports' and any(word in pred_lower for word in ['support', 'true', 'correct', 'yes', 'agree', 'valid', 'accurate', 'affirm', 'confirm', 'verify']):
-                correct += 1
-            # Check for synonyms - REFUTES
-            elif gold_lower == 'refutes' and any(word in pred_lower for word in ['refute', 'false', 'incorrect', 'no', 'wrong', 'disagree', 'invalid', 'inaccurate', 'dispute', 'contradict', 'deny', 'reject', 'disprove']):
-                correct += 1
-            # Check for synonyms - NOT ENOUGH INFO
-            elif gold_lower == 'not enough info' and any(phrase in pred_lower for phrase in ['not enough', 'insufficient', 'unknown', 'unclear', 'cannot determine', 'need more', 'lack of information', 'no information', 'inconclusive', 'uncertain']):
+            # Check for label synonyms (one regex scan per prediction)
+            elif synonyms is not None and synonyms.search(pred_lower):
                 correct += 1
         
         return (correct / len(predictions) * 100) if predictions else 0.0
@@ -260,12 +528,17 @@ class CoKEvaluator:
         """Calculate HotpotQA accuracy - fuzzy matching for entity names."""
         correct = 0
         for pred, gold in zip(predictions, gold_labels):
-            pred_lower = pred.lower().strip()
-            gold_lower = gold.lower().strip()
+            pred_lower = str(pred).lower().strip()
+            gold_lower = str(gold).lower().strip()
+            
+            # Exact match (checked before any cleaning, the common case for correct answers)
+            if pred_lower == gold_lower:
+                correct += 1
+                continue
             
             # Remove punctuation for better matching
-            pred_clean = re.sub(r'[^\w\s]', '', pred_lower)
-            gold_clean = re.sub(r'[^\w\s]', '', gold_lower)
+            pred_clean = _clean(pred_lower)
+            gold_clean = _clean(gold_lower)
             
             # Exact match
             if pred_clean == gold_clean:
@@ -275,15 +548,15 @@ class CoKEvaluator:
                 correct += 1
             # Key words match (at least 60% of gold words in prediction)
             else:
-                pred_words = set(pred_clean.split())
-                gold_words = set(gold_clean.split())
+                pred_words = _tokens(pred_clean)
+                gold_words = _tokens(gold_clean)
                 if gold_words and len(pred_words & gold_words) / len(gold_words) > 0.6:
                     correct += 1
                 # Check if all key words from gold are in pred (for multi-word answers)
                 elif gold_words and len(gold_words) > 1 and all(word in pred_words for word in gold_words if len(word) > 2):
                     correct += 1
                 # Fuzzy similarity
-                elif SequenceMatcher(None, pred_clean, gold_clean).ratio() > 0.7:
+                elif _similar(pred_clean, gold_clean, 0.7):
                     correct += 1
         
         return (correct / len(predictions) * 100) if predictions else 0.0
@@ -294,13 +567,18 @@ class CoKEvaluator:
         for pred, gold in zip(predictions, gold_labels):
             if not gold or gold.strip() == '':
                 continue  # Skip empty gold labels
-                
-            pred_lower = pred.lower().strip()
+            
+            pred_lower = str(pred).lower().strip()
             gold_lower = str(gold).lower().strip()
             
+            # Exact match (checked before any cleaning, the common case for correct answers)
+            if pred_lower == gold_lower:
+                correct += 1
+                continue
+            
             # Remove punctuation for better matching
-            pred_clean = re.sub(r'[^\w\s]', '', pred_lower)
-            gold_clean = re.sub(r'[^\w\s]', '', gold_lower)
+            pred_clean = _clean(pred_lower)
+            gold_clean = _clean(gold_lower)
             
             # Exact match
             if pred_clean == gold_clean:
@@ -310,8 +588,8 @@ class CoKEvaluator:
                 correct += 1
             # Word overlap - if most words match
             else:
-                pred_words = set(pred_clean.split())
-                gold_words = set(gold_clean.split())
+                pred_words = _tokens(pred_clean)
+                gold_words = _tokens(gold_clean)
                 # If >= 60% of gold words are in prediction
                 if gold_words and len(pred_words & gold_words) / len(gold_words) > 0.6:
                     correct += 1
@@ -319,7 +597,7 @@ class CoKEvaluator:
                 elif gold_words and all(word in pred_words for word in gold_words if len(word) > 3):
                     correct += 1
                 # Fuzzy similarity
-                elif SequenceMatcher(None, pred_clean, gold_clean).ratio() > 0.7:
+                elif _similar(pred_clean, gold_clean, 0.7):
                     correct += 1
         
         return (correct / len(predictions) * 100) if predictions else 0.0
@@ -332,7 +610,7 @@ class CoKEvaluator:
             gold_lower = str(gold).lower().strip()
             
             # Extract option letter from prediction
-            pred_letter_match = re.search(r'\b([abcd])\b', pred_lower)
+            pred_letter_match = _MMLU_LETTER_LOW_RE.search(pred_lower)
             if pred_letter_match:
                 pred_letter = pred_letter_match.group(1).upper()
                 gold_letter = gold_lower.upper()
@@ -342,63 +620,76 @@ class CoKEvaluator:
             elif gold_lower.upper() in pred.upper():
                 correct += 1
             # Fuzzy match: check similarity
-            elif SequenceMatcher(None, pred_lower, gold_lower).ratio() > 0.8:
+            elif _similar(pred_lower, gold_lower, 0.8):
                 correct += 1
         
         return (correct / len(predictions) * 100) if predictions else 0.0
     
     def _post_process_prediction(self, prediction: str, dataset_name: str) -> str:
         """Post-process prediction to extract key information based on dataset."""
-        if dataset_name == 'fever':
-            # Extract FEVER label from prediction - check for explicit labels first
-            pred_upper = prediction.upper()
-            # Check for full label names
-            if 'REFUTES' in pred_upper:
-                return 'REFUTES'
-            elif 'SUPPORTS' in pred_upper:
-                return 'SUPPORTS'
-            elif 'NOT ENOUGH INFO' in pred_upper or 'NOT ENOUGH INFORMATION' in pred_upper:
-                return 'NOT ENOUGH INFO'
-            
-            # Check for partial matches
-            if 'REFUTE' in pred_upper and 'REFUTES' not in pred_upper:
-                return 'REFUTES'
-            elif 'SUPPORT' in pred_upper and 'SUPPORTS' not in pred_upper:
-                return 'SUPPORTS'
-            
-            # Fallback to keyword matching (more aggressive)
-            pred_lower = prediction.lower()
-            # Count keyword matches
-            refute_keywords = ['refute', 'false', 'incorrect', 'wrong', 'disagree', 'contradict', 'deny', 'reject', 'disprove', 'inaccurate']
-            support_keywords = ['support', 'true', 'correct', 'yes', 'agree', 'valid', 'accurate', 'affirm', 'confirm', 'verify']
-            info_keywords = ['not enough', 'insufficient', 'unknown', 'unclear', 'cannot determine', 'inconclusive', 'uncertain']
-            
-            refute_count = sum(1 for word in refute_keywords if word in pred_lower)
-            support_count = sum(1 for word in support_keywords if word in pred_lower)
-            info_count = sum(1 for phrase in info_keywords if phrase in pred_lower)
-            
-            if refute_count > support_count and refute_count > info_count:
-                return 'REFUTES'
-            elif support_count > refute_count and support_count > info_count:
-                return 'SUPPORTS'
-            elif info_count > 0:
-                return 'NOT ENOUGH INFO'
-            
-            # Default fallback - return original (will be matched in _calculate_fever_accuracy)
+        post_process = self._POST_PROCESSORS.get(dataset_name)
+        if post_process is None:
+            # For other datasets, return as is (already processed by consolidation)
             return prediction
+        return post_process(self, prediction)
+    
+    def _post_process_fever(self, prediction: str) -> str:
+        """Extract a FEVER label from a prediction."""
+        # Extract FEVER label from prediction - find all labels in one scan, then
+        # prefer full label names over partial matches
+        labels = set(_FEVER_LABEL_RE.findall(prediction.upper()))
+        if 'REFUTES' in labels:
+            return 'REFUTES'
+        elif 'SUPPORTS' in labels:
+            return 'SUPPORTS'
+        elif 'NOT ENOUGH INFO' in labels:
+            return 'NOT ENOUGH INFO'
+        elif 'REFUTE' in labels:
+            return 'REFUTES'
+        elif 'SUPPORT' in labels:
+            return 'SUPPORTS'
         
-        elif dataset_name in ['mmlu_physics', 'mmlu_biology']:
-            # Extract option letter (A, B, C, D) from prediction
-            # Look for patterns like "Answer: A" or "The answer is A" or just "A" at start
-            match = re.search(r'\b([ABCD])\b', prediction.upper())
-            if match:
-                return match.group(1)
-            # Fallback: return first 50 chars
-            return prediction[:50]
+        # Fallback to keyword matching (more aggressive)
+        pred_lower = prediction.lower()
+        # Count distinct keyword matches per label
+        refute_count = len(set(_REFUTE_KEYWORDS_RE.findall(pred_lower)))
+        support_count = len(set(_SUPPORT_KEYWORDS_RE.findall(pred_lower)))
+        info_count = len(set(_INFO_KEYWORDS_RE.findall(pred_lower)))
         
-        else:
-            # For other datasets, return as is (already processed by consolidation)
-            return prediction
+        if refute_count > support_count and refute_count > info_count:
+            return 'REFUTES'
+        elif support_count > refute_count and support_count > info_count:
+            return 'SUPPORTS'
+        elif info_count > 0:
+            return 'NOT ENOUGH INFO'
+        
+        # Default fallback - return original (will be matched in _calculate_fever_accuracy)
+        return prediction
+    
+    def _post_process_mmlu(self, prediction: str) -> str:
+        """Extract an MMLU option letter from a prediction."""
+        # Extract option letter (A, B, C, D) from prediction
+        # Look for patterns like "Answer: A" or "The answer is A" or just "A" at start
+        match = _MMLU_LETTER_RE.search(prediction.upper())
+        if match:
+            return match.group(1)
+        # Fallback: return first 50 chars
+        return prediction[:50]
+    
+    # Per-dataset handlers, looked up once per call instead of walking an if/elif chain
+    _METRIC_FNS = {
+        'fever': _calculate_fever_accuracy,
+        'hotpotqa': _calculate_hotpotqa_accuracy,
+        'medmcqa': _calculate_medmcqa_accuracy,
+        'mmlu_physics': _calculate_mmlu_accuracy,
+        'mmlu_biology': _calculate_mmlu_accuracy,
+    }
+    
+    _POST_PROCESSORS = {
+        'fever': _post_process_fever,
+        'mmlu_physics': _post_process_mmlu,
+        'mmlu_biology': _post_process_mmlu,
+    }
     
     def _print_summary(self, results: Dict):
         """Print evaluation summary."""
@@ -409,21 +700,22 @@ class CoKEvaluator:
             print(f"{dataset_name:20s}: {result['metric_value']:6.2f}%")
         print("="*60)
     
-    def _save_results(self, results: Dict, incremental: bool = False):
-        """Save results to file."""
-        if incremental:
-            # For incremental saves, use a fixed filename
-            filename = './data/results/evaluation_incremental.json'
-        else:
-            # For final save, use timestamp
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'./data/results/evaluation_{timestamp}.json'
-        
-        # Create directory if not exists
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
-        
+    def _save_results(self, results: Dict):
+        """Save aggregate results to a timestamped file."""
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = os.path.join(self.results_dir, f'evaluation_{timestamp}.json')
+        self._write_json(filename, results)
         logger.info(f"Results saved to {filename}")
-
+    
+    def _save_dataset_result(self, dataset_name: str, result: Dict):
+        """Save one dataset's results so completed datasets survive an interrupted run."""
+        filename = os.path.join(self.results_dir, f'{_INCREMENTAL_PREFIX}{dataset_name}.json')
+        self._write_json(filename, result)
+        logger.info(f"Results for {dataset_name} saved to {filename}")
+    
+    def _write_json(self, filename: str, data: Dict):
+        """Write JSON atomically, so readers never see a half-written file."""
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_filename, filename)
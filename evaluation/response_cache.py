@@ -0,0 +1,54 @@
+"""On-disk cache of CoK answers for repeated evaluation runs."""
+import logging
+import threading
+from typing import Dict, Optional
+from src.utils.disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+class CachedCoK:
+    """Wrap a CoK model so answers to previously seen questions come from disk."""
+    
+    def __init__(self, cok_model, cache: DiskCache, model_id: str):
+        """Initialize cached CoK wrapper.
+        
+        Args:
+            cok_model: Wrapped ChainOfKnowledge pipeline
+            cache: Disk cache holding answers
+            model_id: Model identifier included in cache keys
+        """
+        self.cok_model = cok_model
+        self.cache = cache
+        self.model_id = model_id
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def _key(self, question: str, dataset_name: str) -> str:
+        return DiskCache.make_key(self.model_id, dataset_name, question)
+    
+    def lookup(self, question: str, dataset_name: str = "") -> Optional[str]:
+        """Return the cached answer for question, or None on a miss."""
+        answer = self.cache.get(self._key(question, dataset_name))
+        if answer is not None:
+            with self._lock:
+                self.hits += 1
+            logger.debug(f"Response cache hit for: {question[:50]}...")
+        return answer
+    
+    def run(self, question: str, dataset_name: str = "") -> Dict:
+        """Return the cached answer for question, running the pipeline on a miss."""
+        answer = self.lookup(question, dataset_name)
+        if answer is not None:
+            return {"answer": answer, "stage": "cache"}
+        return self.run_uncached(question, dataset_name)
+    
+    def run_uncached(self, question: str, dataset_name: str = "") -> Dict:
+        """Run the pipeline and cache its answer (for callers that already missed lookup)."""
+        with self._lock:
+            self.misses += 1
+        result = self.cok_model.run(question)
+        # Only successful answers are cached so failures are retried next time
+        if result.get('answer'):
+            self.cache.set(self._key(question, dataset_name), result['answer'])
+        return result
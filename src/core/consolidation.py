@@ -5,21 +5,83 @@ from src.utils.prompt_templates import ANSWER_CONSOLIDATION_PROMPT_TEMPLATE
 
 logger = logging.getLogger(__name__)
 
+# Filler phrases stripped from responses, combined so the response is scanned once
+_PREFIX_RE = re.compile(
+    r"Therefore[,\s]+|Thus[,\s]+|Hence[,\s]+|So[,\s]+|Based on[^,]*,\s*"
+    r"|In conclusion[,\s]+|To answer[^,]*,\s*|The answer to[^,]*,\s*",
+    re.IGNORECASE
+)
+
+# Answer indicators, tried in order
+_ANSWER_RES = [
+    re.compile(pattern, re.IGNORECASE | re.DOTALL)
+    for pattern in (
+        r"Final Answer:\s*(.+?)(?:\.|$|\n)",
+        r"Answer:\s*(.+?)(?:\.|$|\n)",
+        r"The answer is\s*(.+?)(?:\.|$|\n)",
+        r"is\s+(.+?)(?:\.|$|\n)",  # "is Paris" or "is William Shakespeare"
+    )
+]
+
+# Keywords marking FEVER-style (fact verification) questions
+_FEVER_KEYWORDS = ('claim', 'statement', 'supports', 'refutes')
+
+# Bare labels the FEVER consolidation prompt asks for
+_FEVER_LABELS = frozenset({'SUPPORTS', 'REFUTES', 'NOT ENOUGH INFO'})
+
+_QUESTION_REF_RE = re.compile(r'the question[^.]*\.?\s*', re.IGNORECASE)
+_QUOTED_RE = re.compile(r'"[^"]*"\s*')
+
+def _last_sentence(text: str) -> str:
+    """Return the last non-empty '.'-separated sentence, stripped (scans from the right)."""
+    end = len(text)
+    while end > 0:
+        start = text.rfind('.', 0, end)
+        sentence = text[start + 1:end].strip()
+        if sentence:
+            return sentence
+        end = start
+    return ''
+
+def _clip_to_tail(text: str, max_chars: int) -> str:
+    """Keep the last max_chars characters of text, where a rationale states its conclusion."""
+    if len(text) <= max_chars:
+        return text
+    return "..." + text[len(text) - max_chars:]
+
 class AnswerConsolidation:
     """Stage 3: Consolidate final answer."""
     
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, max_chars_per_rationale: int = 500, max_total_chars: int = 8000):
+        """
+        Args:
+            llm_client: LLM client used for consolidation
+            max_chars_per_rationale: Each rationale is clipped to its last this many characters
+                in the prompt (the conclusion comes at the end)
+            max_total_chars: Cap on the combined reasoning steps in the prompt
+        """
         self.llm_client = llm_client
+        self.max_chars_per_rationale = max_chars_per_rationale
+        self.max_total_chars = max_total_chars
     
     def consolidate(self, question: str, corrected_rationales: List[str]) -> str:
         """Generate final consolidated answer."""
-        rationale_text = "\n".join([
-            f"{i+1}. {rationale}" 
+        # Bound prompt size: token count drives consolidation latency and cost
+        max_chars = self.max_chars_per_rationale
+        rationale_text = "\n".join(
+            f"{i+1}. {_clip_to_tail(rationale, max_chars)}"
             for i, rationale in enumerate(corrected_rationales)
-        ])
+        )
+        clipped = sum(len(rationale) > max_chars for rationale in corrected_rationales)
+        if clipped:
+            logger.debug(f"Truncated {clipped} rationale(s) to their last {max_chars} chars for consolidation")
+        if len(rationale_text) > self.max_total_chars:
+            logger.debug(f"Truncated reasoning steps from {len(rationale_text)} to {self.max_total_chars} chars")
+            rationale_text = rationale_text[:self.max_total_chars] + "..."
         
         # Detect if this is a FEVER-style question (fact verification)
-        is_fever_style = any(keyword in question.lower() for keyword in ['claim', 'statement', 'supports', 'refutes'])
+        question_lower = question.lower()
+        is_fever_style = any(keyword in question_lower for keyword in _FEVER_KEYWORDS)
         
         if is_fever_style:
             # Use FEVER-specific prompt
@@ -34,6 +96,10 @@ class AnswerConsolidation:
         logger.info("Final answer consolidated")
         
         # Extract concise answer from response
+        if is_fever_style:
+            label = answer.strip().upper()
+            if label in _FEVER_LABELS:
+                return label
         extracted = self._extract_final_answer(answer)
         return extracted
     
@@ -60,57 +126,37 @@ Final Answer:"""
         response = response.strip()
         
         # Remove common prefixes that add unnecessary text
-        prefixes_to_remove = [
-            r"Therefore[,\s]+",
-            r"Thus[,\s]+",
-            r"Hence[,\s]+",
-            r"So[,\s]+",
-            r"Based on[^,]*,\s*",
-            r"In conclusion[,\s]+",
-            r"To answer[^,]*,\s*",
-            r"The answer to[^,]*,\s*",
-        ]
-        
-        cleaned_response = response
-        for prefix in prefixes_to_remove:
-            cleaned_response = re.sub(prefix, "", cleaned_response, flags=re.IGNORECASE)
+        cleaned_response = _PREFIX_RE.sub("", response)
         
         # Look for common answer indicators
-        patterns = [
-            r"Final Answer:\s*(.+?)(?:\.|$|\n)",
-            r"Answer:\s*(.+?)(?:\.|$|\n)",
-            r"The answer is\s*(.+?)(?:\.|$|\n)",
-            r"is\s+(.+?)(?:\.|$|\n)",  # "is Paris" or "is William Shakespeare"
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, cleaned_response, re.IGNORECASE | re.DOTALL)
+        for answer_re in _ANSWER_RES:
+            match = answer_re.search(cleaned_response)
             if match:
                 answer = match.group(1).strip()
                 # Remove quotes if present
                 answer = answer.strip('"\'')
                 # Remove "the question" or similar phrases
-                answer = re.sub(r'the question[^.]*\.?\s*', '', answer, flags=re.IGNORECASE)
-                answer = re.sub(r'"[^"]*"\s*', '', answer)  # Remove quoted question text
+                answer = _QUESTION_REF_RE.sub('', answer)
+                answer = _QUOTED_RE.sub('', answer)  # Remove quoted question text
                 # Take first sentence only
-                if '. ' in answer:
-                    answer = answer.split('. ')[0]
+                end = answer.find('. ')
+                if end != -1:
+                    answer = answer[:end]
                 # Remove trailing punctuation except for single letters (A, B, C, D)
                 if len(answer) > 1 and answer[-1] in '.,;:':
                     answer = answer[:-1]
                 return answer[:200].strip()  # Limit length
         
         # If no pattern found, take last sentence (often contains the answer)
-        sentences = [s.strip() for s in cleaned_response.split('.') if s.strip()]
-        if sentences:
-            last_sentence = sentences[-1]
+        last_sentence = _last_sentence(cleaned_response)
+        if last_sentence:
             # Remove common prefixes from last sentence
             for prefix in ["Therefore ", "Thus ", "Hence ", "So "]:
                 if last_sentence.startswith(prefix):
                     last_sentence = last_sentence[len(prefix):].strip()
             # Remove quotes and question references
             last_sentence = last_sentence.strip('"\'')
-            last_sentence = re.sub(r'the question[^.]*\.?\s*', '', last_sentence, flags=re.IGNORECASE)
+            last_sentence = _QUESTION_REF_RE.sub('', last_sentence)
             return last_sentence[:200].strip()
         
         return cleaned_response[:200].strip()
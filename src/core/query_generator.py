@@ -1,5 +1,8 @@
 from typing import Tuple, List, Dict
+import heapq
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from src.utils.prompt_templates import (
     SPARQL_GENERATION_PROMPT_TEMPLATE,
     MEDICAL_EXTRACTION_PROMPT_TEMPLATE,
@@ -7,145 +10,258 @@ from src.utils.prompt_templates import (
 )
 from src.knowledge.relevance_scorer import RelevanceScorer
 from src.knowledge.source_ranker import KnowledgeSourceRanker
+from src.utils.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# Placeholder some sources return instead of an empty list; never ranked as knowledge
+_NO_RESULTS_PLACEHOLDER = "No results found"
+
+# Stop waiting for slower sources once every kept result scores above this
+_EARLY_STOP_SCORE = 0.6
+
+# Results this similar to one already retrieved (trigram cosine) are dropped as near-duplicates
+_NEAR_DUPLICATE_SIMILARITY = 0.85
+
+# Retrieved knowledge is pasted into the correction prompt; cap it per item and in total
+_MAX_KNOWLEDGE_ITEM_CHARS = 800
+_MAX_KNOWLEDGE_CHARS = 2400
+
+class _IncompleteRetrieval(Exception):
+    """Raised out of the memoized execution when a source timed out or failed.
+    
+    lru_cache doesn't store raised results, so the partial knowledge is returned
+    to the caller without being memoized and the query is retried next time.
+    """
+    
+    def __init__(self, knowledge: str):
+        super().__init__("retrieval incomplete")
+        self.knowledge = knowledge
+
 class AdaptiveQueryGenerator:
     """Stage 2: Generate domain-specific queries."""
     
-    def __init__(self, llm_client, knowledge_sources):
+    def __init__(self, llm_client, knowledge_sources, search_timeout: float = 15.0):
         self.llm_client = llm_client
         self.knowledge_sources = knowledge_sources
+        # Seconds to wait for all sources of one query; slower sources are skipped. Longer than
+        # Wikidata's 10s request timeout and a Wikipedia search plus its page fetches
+        self.search_timeout = search_timeout
         self.relevance_scorer = RelevanceScorer()
         self.source_ranker = KnowledgeSourceRanker()
+        # Per-instance memo of retrieved knowledge; rationales often produce repeated queries
+        self._cached_execute = lru_cache(maxsize=512)(self._execute_query_uncached)
+        # Configured sources don't change after construction, so resolve dispatch once:
+        # ranked SPARQL sources per known domain, and the sources for text queries
+        self._sparql_sources = {
+            domain: self.source_ranker.rank_sources(domain, 'sparql', knowledge_sources)
+            for domain in self.source_ranker.domain_source_priority
+        }
+        self._text_sources = [
+            (name, knowledge_sources[name]) for name in ('wikipedia',) if name in knowledge_sources
+        ]
     
     def generate_query(self, rationale: str, domain: str) -> Tuple[str, str]:
         """Generate query based on domain."""
-        if domain == 'factual':
-            query = self._generate_sparql_query(rationale)
-            return query, 'sparql'
-        elif domain == 'medical':
-            query = self._generate_medical_query(rationale)
-            return query, 'medical'
-        else:  # physics, biology
-            query = self._generate_nl_query(rationale)
-            return query, 'natural_language'
+        prompt, query_type = self._query_prompt(rationale, domain)
+        query = self._finish_query(self.llm_client.call(prompt, temperature=0.0), query_type)
+        return query, query_type
+    
+    def generate_queries_batch(self, rationales: List[str], domain: str) -> List[Tuple[str, str]]:
+        """Generate queries for several rationales in one batched LLM request.
+        
+        Args:
+            rationales: Rationales to generate queries for
+            domain: Knowledge domain shared by all rationales
+        
+        Returns:
+            (query, query_type) tuples in the same order as rationales
+        """
+        prompts = []
+        query_types = []
+        for rationale in rationales:
+            prompt, query_type = self._query_prompt(rationale, domain)
+            prompts.append(prompt)
+            query_types.append(query_type)
+        
+        if hasattr(self.llm_client, 'call_batch'):
+            raw_queries = self.llm_client.call_batch(prompts, temperature=0.0)
+        else:
+            raw_queries = [self.llm_client.call(prompt, temperature=0.0) for prompt in prompts]
+        queries = [self._finish_query(raw, query_type) for raw, query_type in zip(raw_queries, query_types)]
+        
+        return list(zip(queries, query_types))
     
     def execute_query(self, query: str, query_type: str, domain: str) -> str:
-        """Execute query and retrieve knowledge with relevance scoring and source ranking."""
+        """Execute query and retrieve knowledge with relevance scoring and source ranking.
+        
+        Results are cached per (query, query_type, domain); failed executions, and
+        ones where a source timed out or failed, are not cached.
+        """
         try:
-            if query_type == 'sparql':
-                # Rank sources for SPARQL queries
-                ranked_sources = self.source_ranker.rank_sources(domain, query_type, self.knowledge_sources)
-                all_results = []
-                
-                # Try sources in priority order
-                for source_name in ranked_sources:
-                    try:
-                        source = self.knowledge_sources[source_name]
-                        if source_name == 'wikidata_sparql':
-                            results = source.search(query, top_k=5)
-                            if results:
-                                all_results.extend(results)
-                                logger.debug(f"Wikidata SPARQL query executed: {len(results)} results")
-                            else:
-                                # SPARQL failed or returned no results, try fallback
-                                logger.debug("Wikidata SPARQL returned no results, trying fallback")
-                                continue
-                        else:
-                            # Fallback to other sources (e.g., Wikipedia)
-                            logger.debug(f"Trying fallback source: {source_name}")
-                            results = source.search(query, top_k=3)
-                            if results:
-                                all_results.extend(results)
-                        
-                        # If we got results, break (don't try lower priority sources)
-                        if all_results:
-                            break
-                    except Exception as e:
-                        logger.debug(f"Source {source_name} failed: {str(e)}, trying next source")
-                        continue
-                
-                if all_results:
-                    # Score and rank results
-                    scored_results = self.relevance_scorer.score_relevance(query, all_results)
-                    # Filter low-relevance results and get top 3
-                    filtered = self.relevance_scorer.filter_by_threshold(scored_results, threshold=0.1)
-                    top_results = self.relevance_scorer.get_top_k(filtered, top_k=3)
-                    knowledge = "\n".join([item['content'] for item in top_results])
-                    logger.debug(f"SPARQL query executed: {len(top_results)} relevant results from {len(all_results)} total")
-                else:
-                    knowledge = "No results"
-            elif query_type == 'medical':
-                # Try multiple sources and rank results
-                all_results = []
-                if 'wikipedia' in self.knowledge_sources:
-                    try:
-                        results = self.knowledge_sources['wikipedia'].search(query, top_k=5)
-                        all_results.extend(results)
-                    except Exception as e:
-                        logger.warning(f"Wikipedia search failed: {str(e)}")
-                
-                # Score and rank all results
-                if all_results:
-                    scored_results = self.relevance_scorer.score_relevance(query, all_results)
-                    filtered = self.relevance_scorer.filter_by_threshold(scored_results, threshold=0.15)
-                    top_results = self.relevance_scorer.get_top_k(filtered, top_k=3)
-                    knowledge = "\n".join([item['content'] for item in top_results])
-                else:
-                    knowledge = "No results"
-            else:  # natural_language
-                # Try multiple sources and rank results
-                all_results = []
-                if 'wikipedia' in self.knowledge_sources:
-                    try:
-                        results = self.knowledge_sources['wikipedia'].search(query, top_k=5)
-                        all_results.extend(results)
-                    except Exception as e:
-                        logger.warning(f"Wikipedia search failed: {str(e)}")
-                
-                # Score and rank all results
-                if all_results:
-                    scored_results = self.relevance_scorer.score_relevance(query, all_results)
-                    filtered = self.relevance_scorer.filter_by_threshold(scored_results, threshold=0.15)
-                    top_results = self.relevance_scorer.get_top_k(filtered, top_k=3)
-                    knowledge = "\n".join([item['content'] for item in top_results])
-                else:
-                    knowledge = "No results"
-            
-            if knowledge and knowledge != "No results":
-                logger.info(f"Query executed (type={query_type}, retrieved={len(knowledge)} chars)")
-            else:
-                logger.warning(f"Query executed but no relevant results found (type={query_type})")
-            
-            return knowledge if knowledge else "No results found"
-            
+            return self._cached_execute(query.strip(), query_type, domain)
+        except _IncompleteRetrieval as e:
+            return e.knowledge
         except Exception as e:
             logger.error(f"Query execution failed: {str(e)}", exc_info=True)
             # Return empty result instead of raising to allow pipeline to continue
             return "No results found"
     
-    def _generate_sparql_query(self, rationale: str) -> str:
-        """Generate SPARQL query for Wikidata."""
-        prompt = SPARQL_GENERATION_PROMPT_TEMPLATE.format(sentence=rationale)
-        query = self.llm_client.call(prompt, temperature=0.0)
-        return self._clean_sparql_query(query)
+    def clear_query_cache(self):
+        """Drop memoized query results (e.g. between evaluation runs)."""
+        self._cached_execute.cache_clear()
     
-    def _generate_medical_query(self, rationale: str) -> str:
-        """Generate medical knowledge query."""
-        prompt = MEDICAL_EXTRACTION_PROMPT_TEMPLATE.format(sentence=rationale)
-        query = self.llm_client.call(prompt, temperature=0.0)
-        query = query.strip()
-        # Truncate to 300 chars for Wikipedia API limit
-        if len(query) > 300:
-            query = query[:297] + "..."
-        return query
+    def _execute_query_uncached(self, query: str, query_type: str, domain: str) -> str:
+        """Retrieve and score knowledge for a query.
+        
+        Raises _IncompleteRetrieval (carrying the knowledge found) when a source timed
+        out or failed, and propagates unexpected errors.
+        """
+        if query_type == 'sparql':
+            # Rank sources for SPARQL queries
+            ranked_sources = self._sparql_sources.get(domain)
+            if ranked_sources is None:
+                ranked_sources = self.source_ranker.rank_sources(domain, query_type, self.knowledge_sources)
+            # SPARQL goes to Wikidata; the other ranked sources (which search the raw query
+            # text) are only a fallback when Wikidata returns nothing
+            top_results, total, complete = self._retrieve(query, [
+                (source_name, self.knowledge_sources[source_name], 5)
+                for source_name in ranked_sources if source_name == 'wikidata_sparql'
+            ], threshold=0.1)
+            fallback_sources = [
+                (source_name, self.knowledge_sources[source_name], 3)
+                for source_name in ranked_sources if source_name != 'wikidata_sparql'
+            ]
+            if not total and fallback_sources:
+                logger.debug("Wikidata SPARQL returned no results, trying fallback sources")
+                top_results, total, fallback_complete = self._retrieve(query, fallback_sources, threshold=0.1)
+                complete = complete and fallback_complete
+            
+            if top_results:
+                knowledge = self._join_knowledge(top_results)
+                logger.debug(f"SPARQL query executed: {len(top_results)} relevant results from {total} total")
+            else:
+                knowledge = "No results"
+        else:  # medical, natural_language
+            # Query all text sources concurrently and rank their merged results
+            top_results, _, complete = self._retrieve(query, [
+                (source_name, source, 5) for source_name, source in self._text_sources
+            ], threshold=0.15)
+            
+            if top_results:
+                knowledge = self._join_knowledge(top_results)
+            else:
+                knowledge = "No results"
+        
+        if knowledge and knowledge != "No results":
+            logger.info(f"Query executed (type={query_type}, retrieved={len(knowledge)} chars)")
+        else:
+            logger.warning(f"Query executed but no relevant results found (type={query_type})")
+        
+        knowledge = knowledge if knowledge else "No results found"
+        if not complete:
+            raise _IncompleteRetrieval(knowledge)
+        return knowledge
+    
+    def _retrieve(self, query: str, sources: List[Tuple[str, object, int]], threshold: float,
+                  top_k: int = 3) -> Tuple[List[Dict], int, bool]:
+        """Search sources concurrently and keep the top k scored results across them.
+        
+        Results are scored as each source returns. Once the top k all score above
+        _EARLY_STOP_SCORE, slower sources are no longer waited for.
+        
+        Args:
+            query: Query to run against every source
+            sources: (name, source, top_k) tuples in priority order
+            threshold: Minimum relevance score
+            top_k: Number of results to keep
+        
+        Returns:
+            (top results, highest score first; number of results retrieved; whether no
+            source timed out or failed)
+        """
+        if not sources:
+            return [], 0, True
+        # One thread per source, private to this call: concurrent pipeline runs don't queue
+        # behind each other, so the timeout only counts time spent searching
+        executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="knowledge-search")
+        futures = {
+            executor.submit(source.search, query, top_k=source_top_k): (rank, source_name)
+            for rank, (source_name, source, source_top_k) in enumerate(sources)
+        }
+        # (score, -source rank, -position) orders ties like a merge in priority order
+        best = []
+        total = 0
+        complete = True
+        # Sources often return the same passage; duplicates are dropped before scoring
+        seen_exact = set()
+        seen_similar = SemanticCache(
+            _NEAR_DUPLICATE_SIMILARITY, maxsize=max(1, sum(source_top_k for _, _, source_top_k in sources))
+        )
+        try:
+            for future in as_completed(futures, timeout=self.search_timeout):
+                rank, source_name = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.warning(f"{source_name} search failed: {str(e)}")
+                    complete = False
+                    continue
+                results = [item for item in results if item != _NO_RESULTS_PLACEHOLDER]
+                if not results:
+                    continue
+                logger.debug(f"{source_name} query executed: {len(results)} results")
+                total += len(results)
+                results = self._drop_duplicates(results, seen_exact, seen_similar)
+                if not results:
+                    continue
+                scored = self.relevance_scorer.score_and_topk(query, results, threshold=threshold, top_k=top_k)
+                best = heapq.nlargest(
+                    top_k,
+                    best + [(item['score'], -rank, -position, item) for position, item in enumerate(scored)],
+                    key=lambda entry: entry[:3]
+                )
+                if len(best) == top_k and best[-1][0] > _EARLY_STOP_SCORE:
+                    logger.debug(f"Top {top_k} results above {_EARLY_STOP_SCORE}, not waiting for remaining sources")
+                    break
+        except TimeoutError:
+            logger.warning(f"Search timed out after {self.search_timeout}s")
+            complete = False
+        # Searches still running can't be interrupted; let them finish without waiting
+        executor.shutdown(wait=False, cancel_futures=True)
+        return [entry[3] for entry in best], total, complete
+    
+    def _join_knowledge(self, top_results: List[Dict]) -> str:
+        """Join result contents into one knowledge string within the prompt budget."""
+        knowledge = "\n".join(item['content'][:_MAX_KNOWLEDGE_ITEM_CHARS] for item in top_results)
+        return knowledge[:_MAX_KNOWLEDGE_CHARS]
+    
+    def _drop_duplicates(self, results: List[str], seen_exact: set, seen_similar: SemanticCache) -> List[str]:
+        """Filter out results already seen verbatim or as a near-duplicate, recording the rest."""
+        unique = []
+        for item in results:
+            key = item[:500]
+            if key in seen_exact or seen_similar.get(item) is not None:
+                continue
+            seen_exact.add(key)
+            seen_similar.set(item, True)
+            unique.append(item)
+        return unique
+    
+    def _query_prompt(self, rationale: str, domain: str) -> Tuple[str, str]:
+        """Build the query-generation prompt and query type for a domain."""
+        if domain == 'factual':
+            return SPARQL_GENERATION_PROMPT_TEMPLATE.format(sentence=rationale), 'sparql'
+        elif domain == 'medical':
+            return MEDICAL_EXTRACTION_PROMPT_TEMPLATE.format(sentence=rationale), 'medical'
+        else:  # physics, biology
+            return NL_QUERY_EXTRACTION_PROMPT_TEMPLATE.format(sentence=rationale), 'natural_language'
     
-    def _generate_nl_query(self, rationale: str) -> str:
-        """Generate natural language query."""
-        prompt = NL_QUERY_EXTRACTION_PROMPT_TEMPLATE.format(sentence=rationale)
-        query = self.llm_client.call(prompt, temperature=0.0)
-        query = query.strip()
+    def _finish_query(self, raw_query: str, query_type: str) -> str:
+        """Turn raw LLM output into an executable query."""
+        if query_type == 'sparql':
+            return self._clean_sparql_query(raw_query)
+        query = raw_query.strip()
         # Truncate to 300 chars for Wikipedia API limit
         if len(query) > 300:
             query = query[:297] + "..."
@@ -154,8 +270,8 @@ class AdaptiveQueryGenerator:
     def _clean_sparql_query(self, query_str: str) -> str:
         """Clean SPARQL query output."""
         if '```' in query_str:
-            query_str = query_str.split('```')[1]
-            if query_str.startswith('sparql'):
-                query_str = query_str[7:]
+            _, _, rest = query_str.partition('```')
+            fenced, _, _ = rest.partition('```')
+            query_str = fenced.removeprefix('sparql')
         return query_str.strip()
 
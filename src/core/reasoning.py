@@ -1,5 +1,9 @@
-from typing import List
+from typing import List, Optional
 import logging
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from config.settings import config
 from src.utils.prompt_templates import (
     REASONING_PROMPT_TEMPLATE,
@@ -8,28 +12,77 @@ from src.utils.prompt_templates import (
 
 logger = logging.getLogger(__name__)
 
+# Answer markers in priority order, lowercase ("Final Answer:" and "The answer is"
+# contain "answer:" and "answer is", so they never take precedence)
+_ANSWER_INDICATORS = ("answer:", "answer is", "conclusion:")
+
+# Lead-in words stripped from a fallback last sentence, in order, lowercase
+_SENTENCE_PREFIXES = ("so ", "thus ", "therefore ", "hence ", "based on ", "in conclusion ")
+
+# References to the question itself, removed from a fallback last sentence
+_QUESTION_REF_RE = re.compile(r'the question[^.]*\.?\s*', re.IGNORECASE)
+_QUOTED_RE = re.compile(r'"[^"]*"\s*')
+
+# Lead-ins dropped before comparing answers: each prefix optionally, in order, with the
+# whitespace and colons that follow it
+_NORMALIZE_PREFIX_RE = re.compile(''.join(
+    rf'(?:{re.escape(prefix)}\s*:*\s*)?'
+    for prefix in ("the answer is", "answer:", "therefore", "thus", "so")
+))
+
+# Domain keywords mapping, one substring alternation per domain
+_DOMAIN_KEYWORDS = {
+    'factual': ['factual', 'wikipedia', 'historical', 'geographic', 'political', 'general knowledge'],
+    'medical': ['medical', 'health', 'disease', 'treatment', 'medicine', 'patient', 'clinical', 'diagnosis'],
+    'physics': ['physics', 'force', 'energy', 'motion', 'quantum', 'relativity', 'mechanics', 'electromagnetic'],
+    'biology': ['biology', 'organism', 'cell', 'genetics', 'evolution', 'species', 'molecular', 'biochemical']
+}
+_DOMAIN_RES = {
+    domain: re.compile('|'.join(map(re.escape, keywords)))
+    for domain, keywords in _DOMAIN_KEYWORDS.items()
+}
+
 class ReasoningPreparation:
     """Stage 1: Generate initial rationales and identify domains."""
     
-    def __init__(self, llm_client, k: int = 5):
+    def __init__(self, llm_client, k: int = 5, max_concurrency: int = 5):
         self.llm_client = llm_client
         self.k = k
+        # Upper bound on rationale requests in flight at once (provider rate limits)
+        self.max_concurrency = max_concurrency
+        # Domains depend only on the question; memoized per instance
+        self._cached_domains = lru_cache(maxsize=1024)(self._identify_domains_uncached)
     
-    def generate_rationales(self, question: str) -> List[str]:
-        """Generate k rationales using chain-of-thought."""
-        rationales = []
-        logger.info(f"Generating {self.k} rationales")
+    def generate_rationales(self, question: str, k: Optional[int] = None) -> List[str]:
+        """Generate k rationales using chain-of-thought (defaults to self.k).
+        
+        The k samples are independent, so they are requested concurrently.
+        """
+        k = k if k is not None else self.k
+        logger.info(f"Generating {k} rationales")
+        if k <= 0:
+            return []
+        
+        prompt = REASONING_PROMPT_TEMPLATE.format(question=question)
         
-        for i in range(self.k):
-            prompt = REASONING_PROMPT_TEMPLATE.format(question=question)
+        if hasattr(self.llm_client, 'call_n'):
+            # One request returns all k samples, sharing the prompt prefill
+            rationales = self.llm_client.call_n(prompt, k, temperature=config.REASONING_TEMPERATURE)
+            logger.debug(f"Generated {len(rationales)} rationales in one request")
+            return rationales
+        
+        def sample(i: int) -> str:
+            # Sample index keeps the k sampled calls distinct for response caches
             rationale = self.llm_client.call(
                 prompt, 
-                temperature=config.REASONING_TEMPERATURE
+                temperature=config.REASONING_TEMPERATURE,
+                sample_index=i
             )
-            rationales.append(rationale)
-            logger.debug(f"Generated rationale {i+1}/{self.k}")
+            logger.debug(f"Generated rationale {i+1}/{k}")
+            return rationale
         
-        return rationales
+        with ThreadPoolExecutor(max_workers=max(1, min(k, self.max_concurrency))) as pool:
+            return list(pool.map(sample, range(k)))
     
     def generate_answers(self, question: str, rationales: List[str]) -> List[str]:
         """Extract answers from rationales."""
@@ -41,25 +94,31 @@ class ReasoningPreparation:
         return answers
     
     def identify_domains(self, question: str) -> List[str]:
-        """Identify relevant knowledge domains."""
+        """Identify relevant knowledge domains (cached per question)."""
+        return list(self._cached_domains(question))
+    
+    def _identify_domains_uncached(self, question: str) -> tuple:
+        """Ask the LLM for the question's domains."""
         prompt = DOMAIN_IDENTIFICATION_PROMPT_TEMPLATE.format(question=question)
         response = self.llm_client.call(prompt, temperature=0.0)
         domains = self._parse_domains(response)
         logger.info(f"Identified domains: {domains}")
-        return domains
+        return tuple(domains)
     
     def has_consensus(self, answers: List[str], threshold: float = 0.5) -> bool:
         """Check if answers have consensus."""
         if not answers:
             return False
         
-        # Normalize answers for better comparison
-        normalized_answers = [self._normalize_answer(a) for a in answers]
-        
-        from collections import Counter
-        counter = Counter(normalized_answers)
-        most_common_answer, count = counter.most_common(1)[0]
-        agreement = count / len(answers)
+        if len(set(answers)) == 1:
+            # Identical answers agree after normalization too
+            agreement = 1.0
+        else:
+            # Normalize answers for better comparison
+            normalized_answers = [self._normalize_answer(a) for a in answers]
+            counter = Counter(normalized_answers)
+            most_common_answer, count = counter.most_common(1)[0]
+            agreement = count / len(answers)
         
         has_consensus = agreement > threshold
         logger.info(f"Consensus check: {agreement:.2%} agreement (threshold: {threshold:.0%})")
@@ -71,11 +130,8 @@ class ReasoningPreparation:
     def _normalize_answer(self, answer: str) -> str:
         """Normalize answer for comparison (remove extra words, lowercase, etc.)."""
         # Remove common prefixes
-        prefixes = ["the answer is", "answer:", "therefore", "thus", "so"]
         answer_lower = answer.lower().strip()
-        for prefix in prefixes:
-            if answer_lower.startswith(prefix):
-                answer_lower = answer_lower[len(prefix):].strip().lstrip(':').strip()
+        answer_lower = answer_lower[_NORMALIZE_PREFIX_RE.match(answer_lower).end():]
         
         # Take first 100 chars and remove punctuation for comparison
         answer_lower = answer_lower[:100]
@@ -86,39 +142,37 @@ class ReasoningPreparation:
     def _extract_answer(self, rationale: str) -> str:
         """Extract answer from rationale - improved version."""
         # Clean markdown formatting
-        rationale = rationale.replace('**', '').replace('*', '').strip()
+        rationale = rationale.replace('*', '').strip()
         
-        # First priority: explicit answer markers
-        indicators = ["Answer:", "Final Answer:", "Answer is", "The answer is", "Conclusion:"]
-        for indicator in indicators:
-            if indicator.lower() in rationale.lower():
-                parts = rationale.lower().split(indicator.lower())
-                if len(parts) > 1:
-                    answer = parts[-1].strip()
-                    # Clean up
-                    answer = answer.split('\n')[0].strip()  # First line only
-                    answer = answer.split('Therefore')[0].strip()
-                    answer = answer.split('Thus')[0].strip()
-                    answer = answer.split('Hence')[0].strip()
-                    # Remove leading punctuation
-                    answer = answer.lstrip(':').strip()
-                    # Take first sentence if multiple
-                    if '. ' in answer:
-                        answer = answer.split('. ')[0] + '.'
-                    return answer.strip()
+        # First priority: explicit answer markers (text after the last occurrence)
+        rationale_lower = rationale.lower()
+        for indicator in _ANSWER_INDICATORS:
+            start = rationale_lower.rfind(indicator)
+            if start != -1:
+                answer = rationale_lower[start + len(indicator):].strip()
+                # Clean up
+                answer = answer.partition('\n')[0].strip()  # First line only
+                # Remove leading punctuation
+                answer = answer.lstrip(':').strip()
+                # Take first sentence if multiple
+                end = answer.find('. ')
+                if end != -1:
+                    answer = answer[:end] + '.'
+                return answer.strip()
         
         # Second priority: last sentence
         sentences = [s.strip() for s in rationale.split('.') if s.strip()]
         if sentences:
             last_sentence = sentences[-1]
-            # Remove common prefixes
-            for prefix in ["So ", "Thus ", "Therefore ", "Hence ", "Based on ", "In conclusion "]:
-                if last_sentence.lower().startswith(prefix.lower()):
+            # Remove common prefixes (lowercase copy refreshed only when a prefix is stripped)
+            last_lower = last_sentence.lower()
+            for prefix in _SENTENCE_PREFIXES:
+                if last_lower.startswith(prefix):
                     last_sentence = last_sentence[len(prefix):].strip()
+                    last_lower = last_sentence.lower()
             # Remove question references
-            import re
-            last_sentence = re.sub(r'the question[^.]*\.?\s*', '', last_sentence, flags=re.IGNORECASE)
-            last_sentence = re.sub(r'"[^"]*"\s*', '', last_sentence)  # Remove quoted question text
+            last_sentence = _QUESTION_REF_RE.sub('', last_sentence)
+            last_sentence = _QUOTED_RE.sub('', last_sentence)  # Remove quoted question text
             return last_sentence.strip()
         
         return rationale.strip()[:100]  # Fallback
@@ -126,19 +180,8 @@ class ReasoningPreparation:
     def _parse_domains(self, domains_str: str) -> List[str]:
         """Parse domains from text - improved version."""
         domains_str = domains_str.lower()
-        found_domains = []
-        
-        # Domain keywords mapping
-        domain_keywords = {
-            'factual': ['factual', 'wikipedia', 'historical', 'geographic', 'political', 'general knowledge'],
-            'medical': ['medical', 'health', 'disease', 'treatment', 'medicine', 'patient', 'clinical', 'diagnosis'],
-            'physics': ['physics', 'force', 'energy', 'motion', 'quantum', 'relativity', 'mechanics', 'electromagnetic'],
-            'biology': ['biology', 'organism', 'cell', 'genetics', 'evolution', 'species', 'molecular', 'biochemical']
-        }
-        
-        for domain, keywords in domain_keywords.items():
-            if any(keyword in domains_str for keyword in keywords):
-                found_domains.append(domain)
-        
+        found_domains = [
+            domain for domain, keywords_re in _DOMAIN_RES.items()
+            if keywords_re.search(domains_str)
+        ]
         return found_domains if found_domains else ['factual']
-
@@ -1,10 +1,26 @@
 """Relevance scoring for retrieved knowledge."""
+import heapq
 import logging
-from typing import List, Dict
-from difflib import SequenceMatcher
+from typing import List, Dict, Tuple
+from functools import lru_cache
+from operator import itemgetter
+import numpy as np
+from rapidfuzz import fuzz, process
 
 logger = logging.getLogger(__name__)
 
+def _prepare_query(query: str) -> Tuple[str, set, Tuple[str, ...]]:
+    """Normalize a query once per scoring call: (lowercased, word set, words longer than 3 chars)."""
+    query_lower = query.lower()
+    query_words = set(query_lower.split())
+    return query_lower, query_words, tuple(word for word in query_words if len(word) > 3)
+
+@lru_cache(maxsize=1024)
+def _prepare_knowledge(knowledge: str) -> Tuple[str, frozenset]:
+    """Lowercased text and word set of a knowledge item (snippets recur across queries)."""
+    knowledge_lower = knowledge.lower()
+    return knowledge_lower, frozenset(knowledge_lower.split())
+
 class RelevanceScorer:
     """Score relevance of retrieved knowledge to query."""
     
@@ -22,66 +38,100 @@ class RelevanceScorer:
         Returns:
             List of dicts with 'content' and 'score' keys, sorted by score (highest first)
         """
-        scored_items = []
-        
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
-        
-        for item in knowledge_items:
-            score = self._calculate_score(query, query_words, item)
-            scored_items.append({
+        scores = self._calculate_scores(_prepare_query(query), knowledge_items)
+        scored_items = [
+            {
                 'content': item,
                 'score': score,
                 'source': 'unknown'  # Can be set by caller
-            })
+            }
+            for item, score in zip(knowledge_items, scores.tolist())
+        ]
         
         # Sort by score (highest first)
         scored_items.sort(key=lambda x: x['score'], reverse=True)
         
         return scored_items
     
-    def _calculate_score(self, query: str, query_words: set, knowledge: str) -> float:
-        """Calculate relevance score between query and knowledge.
+    def score_and_topk(self, query: str, knowledge_items: List[str],
+                       threshold: float = 0.1, top_k: int = 3) -> List[Dict[str, any]]:
+        """Score knowledge items and keep the top k above a threshold in one pass.
+        
+        Same result as get_top_k(filter_by_threshold(score_relevance(...))), but
+        items below the threshold are dropped as they are scored and only the
+        top k are selected instead of sorting every item.
         
         Args:
-            query: Original query
-            query_words: Set of words from query
-            knowledge: Knowledge string to score
+            query: Original query string
+            knowledge_items: List of knowledge strings to score
+            threshold: Minimum score threshold
+            top_k: Number of items to return
             
         Returns:
-            Relevance score between 0.0 and 1.0
+            Up to top_k dicts with 'content' and 'score' keys, highest score first
         """
-        if not knowledge or len(knowledge.strip()) == 0:
-            return 0.0
-        
-        query_lower = query.lower()
-        knowledge_lower = knowledge.lower()
-        knowledge_words = set(knowledge_lower.split())
+        scores = self._calculate_scores(_prepare_query(query), knowledge_items)
+        candidates = [
+            {
+                'content': item,
+                'score': score,
+                'source': 'unknown'  # Can be set by caller
+            }
+            for item, score in zip(knowledge_items, scores.tolist())
+            if score >= threshold
+        ]
         
-        # Score components
-        scores = []
+        # Stable like the full sort: ties keep retrieval order
+        return heapq.nlargest(top_k, candidates, key=itemgetter('score'))
+    
+    def _calculate_scores(self, prepared_query: Tuple[str, set, Tuple[str, ...]],
+                          knowledge_items: List[str]) -> np.ndarray:
+        """Calculate relevance scores between query and each knowledge item.
         
-        # 1. Word overlap score (0-1)
-        if query_words:
-            overlap = len(query_words & knowledge_words) / len(query_words)
-            scores.append(overlap * 0.4)  # 40% weight
+        Each score component is computed as a column over all items and the
+        weighted sum is taken in one array expression.
         
-        # 2. Substring match score (0-1)
-        # Check if query appears in knowledge
-        if query_lower in knowledge_lower:
-            scores.append(0.3)  # 30% weight for exact substring match
-        elif any(word in knowledge_lower for word in query_words if len(word) > 3):
-            scores.append(0.15)  # 15% weight for partial match
+        Args:
+            prepared_query: Normalized query from _prepare_query
+            knowledge_items: Knowledge strings to score
+            
+        Returns:
+            Relevance scores between 0.0 and 1.0, one per item
+        """
+        query_lower, query_words, long_words = prepared_query
+        n = len(knowledge_items)
+        overlap = np.zeros(n)
+        substring = np.zeros(n)
+        empty = np.zeros(n, dtype=bool)
+        heads = [''] * n
         
-        # 3. Sequence similarity (0-1)
-        similarity = SequenceMatcher(None, query_lower, knowledge_lower[:500]).ratio()
-        scores.append(similarity * 0.3)  # 30% weight
+        for i, knowledge in enumerate(knowledge_items):
+            if not knowledge or len(knowledge.strip()) == 0:
+                empty[i] = True
+                continue
+            knowledge_lower, knowledge_words = _prepare_knowledge(knowledge)
+            
+            # 1. Word overlap score (0-1)
+            if query_words:
+                overlap[i] = len(query_words & knowledge_words) / len(query_words)
+            
+            # 2. Substring match score: exact query in knowledge, else any long query word
+            if query_lower in knowledge_lower:
+                substring[i] = 0.3
+            elif any(word in knowledge_lower for word in long_words):
+                substring[i] = 0.15
+            
+            heads[i] = knowledge_lower[:500]
         
-        # Combine scores
-        total_score = sum(scores)
+        # 3. Sequence similarity (0-1), for all items in one call
+        similarity = np.zeros(n)
+        if n:
+            similarity[:] = process.cdist([query_lower], heads, scorer=fuzz.ratio, dtype=np.float64)[0] / 100.0
         
-        # Normalize to 0-1 range
-        return min(1.0, max(0.0, total_score))
+        # Weights: 40% overlap, up to 30% substring match, 30% similarity
+        scores = np.clip(overlap * 0.4 + substring + similarity * 0.3, 0.0, 1.0)
+        scores[empty] = 0.0
+        return scores
     
     def filter_by_threshold(self, scored_items: List[Dict], threshold: float = 0.1) -> List[Dict]:
         """Filter scored items by relevance threshold.
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Optional
 import logging
+from src.utils.disk_cache import DiskCache
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +19,36 @@ class KnowledgeSource(ABC):
         """Get source name."""
         pass
 
+class CachedKnowledgeSource(KnowledgeSource):
+    """Persist a source's search results on disk so repeated runs skip the network."""
+    
+    def __init__(self, source: KnowledgeSource, cache: DiskCache):
+        """Initialize cached source.
+        
+        Args:
+            source: Wrapped knowledge source
+            cache: Disk cache holding results (its max_age sets the TTL)
+        """
+        self.source = source
+        self.cache = cache
+    
+    def search(self, query: str, top_k: int = 3) -> List[str]:
+        """Search the wrapped source unless results for (query, top_k) are cached."""
+        key = DiskCache.make_key(self.source.get_name(), query, str(top_k))
+        results = self.cache.get(key)
+        if results is not None:
+            logger.debug(f"Search cache hit for {self.source.get_name()}: {query[:50]}...")
+            return results
+        
+        results = self.source.search(query, top_k)
+        # Empty or placeholder results may come from transient failures, so they aren't stored
+        if results and results != ["No results found"]:
+            self.cache.set(key, results)
+        return results
+    
+    def get_name(self) -> str:
+        return self.source.get_name()
+
 class CompositeKnowledgeSource:
     """Manages multiple knowledge sources."""
     
@@ -28,14 +60,36 @@ class CompositeKnowledgeSource:
         self.sources[name] = source
         logger.info(f"Added knowledge source: {name}")
     
-    def search_all_sources(self, query: str, top_k: int = 3) -> Dict[str, List[str]]:
-        """Search across all sources."""
-        results = {}
-        for name, source in self.sources.items():
-            try:
-                results[name] = source.search(query, top_k)
-            except Exception as e:
-                logger.warning(f"Search failed for {name}: {str(e)}")
-                results[name] = []
-        return results
-
+    def search_all_sources(self, query: str, top_k: int = 3,
+                           timeout: Optional[float] = 10.0) -> Dict[str, List[str]]:
+        """Search across all sources in parallel.
+        
+        Args:
+            query: Search query
+            top_k: Number of results per source
+            timeout: Overall seconds to wait; sources still running get no results
+        
+        Returns:
+            Results per source name
+        """
+        if not self.sources:
+            return {}
+        
+        executor = ThreadPoolExecutor(max_workers=len(self.sources))
+        futures = {name: executor.submit(source.search, query, top_k)
+                   for name, source in self.sources.items()}
+        wait(futures.values(), timeout=timeout)
+        # Don't block on sources that missed the deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+        return {name: self._safe_result(name, future) for name, future in futures.items()}
+    
+    @staticmethod
+    def _safe_result(name: str, future: Future) -> List[str]:
+        if not future.done():
+            logger.warning(f"Search timed out for {name}")
+            return []
+        try:
+            return future.result()
+        except Exception as e:
+            logger.warning(f"Search failed for {name}: {str(e)}")
+            return []
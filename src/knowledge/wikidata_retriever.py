@@ -1,8 +1,9 @@
 """Wikidata SPARQL retriever implementation."""
 import requests
+from requests.adapters import HTTPAdapter
 import logging
 import re
-from typing import List
+from typing import List, Optional
 from .sources import KnowledgeSource
 
 logger = logging.getLogger(__name__)
@@ -12,13 +13,19 @@ class WikidataSPARQLRetriever(KnowledgeSource):
     
     WIKIDATA_SPARQL_ENDPOINT = "https://query.wikidata.org/sparql"
     
-    def __init__(self, timeout: int = 10):
+    def __init__(self, timeout: int = 10, session: Optional[requests.Session] = None):
         """Initialize Wikidata SPARQL retriever.
         
         Args:
             timeout: Request timeout in seconds
+            session: Optional shared HTTP session (a pooled one is created if omitted)
         """
         self.timeout = timeout
+        # Keep-alive session so repeated queries reuse the TCP/TLS connection
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+        self.session = session
     
     def search(self, sparql_query: str, top_k: int = 3) -> List[str]:
         """Execute SPARQL query and return top k results.
@@ -77,7 +84,7 @@ class WikidataSPARQLRetriever(KnowledgeSource):
         
         params = {'query': query, 'format': 'json'}
         
-        response = requests.get(
+        response = self.session.get(
             self.WIKIDATA_SPARQL_ENDPOINT,
             params=params,
             headers=headers,
@@ -1,11 +1,23 @@
-from typing import Optional
+from typing import Callable, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from together import Together
+from together.error import InvalidRequestError
 import logging
+import threading
+from src.utils.disk_cache import DiskCache
 
 logger = logging.getLogger(__name__)
 
+def _call_concurrently(call: Callable[[str], str], prompts: List[str], max_workers: int) -> List[str]:
+    """Run call over prompts with bounded concurrency, preserving order."""
+    if len(prompts) <= 1:
+        return [call(prompt) for prompt in prompts]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(prompts))) as pool:
+        return list(pool.map(call, prompts))
+
 class TogetherAIClient:
-    """Together AI API client with caching and error handling."""
+    """Together AI API client with error handling."""
     
     def __init__(self, api_key: str, model: str = "meta-llama/Llama-3-70b-chat-hf", 
                  temperature: float = 0.0, max_tokens: int = 1024):
@@ -22,26 +34,20 @@ class TogetherAIClient:
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
-        self.request_cache = {}
         logger.info(f"TogetherAI client initialized with model: {model}")
     
-    def call(self, prompt: str, temperature: Optional[float] = None) -> str:
+    def call(self, prompt: str, temperature: Optional[float] = None, sample_index: int = 0) -> str:
         """
-        Call Together AI API with caching.
+        Call Together AI API.
         
         Args:
             prompt: Input prompt
             temperature: Optional override for temperature
+            sample_index: Index of a repeated sample (only used by caching wrappers)
         
         Returns:
             Generated response
         """
-        # Use cache
-        cache_key = hash(prompt)
-        if cache_key in self.request_cache:
-            logger.debug("Cache hit")
-            return self.request_cache[cache_key]
-        
         temp = temperature if temperature is not None else self.temperature
         
         try:
@@ -55,7 +61,6 @@ class TogetherAIClient:
             )
             
             result = response.choices[0].message.content
-            self.request_cache[cache_key] = result
             
             logger.debug(f"Together AI call successful ({len(result)} chars)")
             return result
@@ -63,6 +68,211 @@ class TogetherAIClient:
         except Exception as e:
             logger.error(f"Together AI API error: {str(e)}")
             raise
+    
+    def call_n(self, prompt: str, n: int, temperature: Optional[float] = None) -> List[str]:
+        """
+        Sample n responses to one prompt in a single request (the prompt is prefilled once).
+        
+        Falls back to separate requests for samples the single request didn't return,
+        or for all of them if the API rejects n.
+        
+        Args:
+            prompt: Input prompt
+            n: Number of responses to sample
+            temperature: Optional override for temperature
+        
+        Returns:
+            n generated responses
+        """
+        temp = temperature if temperature is not None else self.temperature
+        
+        try:
+            logger.debug(f"Calling Together AI (model={self.model}, temp={temp}, n={n})")
+            
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temp,
+                max_tokens=self.max_tokens,
+                n=n
+            )
+            
+            results = [choice.message.content for choice in response.choices[:n]]
+        except InvalidRequestError as e:
+            # Model or endpoint rejected n (HTTP 400): fall back to one request per sample below.
+            # Rate-limit and auth errors propagate so callers back off instead of sending n requests
+            logger.warning(f"Together AI rejected n={n}, sampling separately: {str(e)}")
+            results = []
+        except Exception as e:
+            logger.error(f"Together AI API error: {str(e)}")
+            raise
+        
+        if len(results) < n:
+            # Model ignored n (or the request failed): sample the rest with separate requests
+            logger.debug(f"Together AI returned {len(results)}/{n} samples, requesting the rest")
+            results.extend(_call_concurrently(
+                lambda i: self.call(prompt, temp, sample_index=i), list(range(len(results), n)), max_workers=n
+            ))
+        return results
+    
+    def call_batch(self, prompts: List[str], temperature: Optional[float] = None,
+                   max_workers: int = 4) -> List[str]:
+        """
+        Call Together AI for several prompts at once.
+        
+        The chat completions endpoint takes one conversation per request, so
+        prompts are sent concurrently and share the client's connection pool.
+        
+        Args:
+            prompts: Input prompts
+            temperature: Optional override for temperature
+            max_workers: Maximum number of concurrent requests
+        
+        Returns:
+            Generated responses in the same order as prompts
+        """
+        return _call_concurrently(lambda prompt: self.call(prompt, temperature), prompts, max_workers)
+
+class CachedLLMClient:
+    """Exact-match response cache in front of an LLM client.
+    
+    Responses are memoized in memory (LRU) and optionally on disk, keyed by model,
+    temperature, sample index and whitespace-normalized prompt. Sampled calls
+    (temperature > 0) that pass distinct sample indices still diverge, while a re-run
+    reuses the same samples.
+    """
+    
+    def __init__(self, client, cache: Optional[DiskCache] = None, maxsize: int = 4096):
+        """
+        Initialize cached client.
+        
+        Args:
+            client: Wrapped LLM client
+            cache: Optional disk cache shared across runs
+            maxsize: Maximum number of responses kept in memory
+        """
+        self.client = client
+        self.cache = cache
+        # Part of every key, so switching models invalidates cached responses
+        self.model = getattr(client, 'model', type(client).__name__)
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __getattr__(self, name):
+        # Expose the wrapped client's settings (temperature, max_tokens, ...)
+        return getattr(self.client, name)
+    
+    def call(self, prompt: str, temperature: Optional[float] = None, sample_index: int = 0) -> str:
+        """
+        Call the wrapped client unless the response is already cached.
+        
+        Args:
+            prompt: Input prompt
+            temperature: Optional override for temperature
+            sample_index: Index distinguishing repeated samples of the same prompt
+        
+        Returns:
+            Generated response
+        """
+        key = self._key(prompt, temperature, sample_index)
+        response = self._lookup(key)
+        if response is None:
+            response = self.client.call(prompt, temperature=key[1])
+            self._store(key, response)
+        return response
+    
+    def call_n(self, prompt: str, n: int, temperature: Optional[float] = None) -> List[str]:
+        """
+        Sample n responses to one prompt, requesting only uncached samples.
+        
+        Samples are cached under sample indices 0..n-1, shared with call().
+        
+        Args:
+            prompt: Input prompt
+            n: Number of responses to sample
+            temperature: Optional override for temperature
+        
+        Returns:
+            n generated responses
+        """
+        keys = [self._key(prompt, temperature, i) for i in range(n)]
+        responses = [self._lookup(key) for key in keys]
+        missing = [i for i, response in enumerate(responses) if response is None]
+        if not missing:
+            return responses
+        
+        if hasattr(self.client, 'call_n'):
+            fresh = self.client.call_n(prompt, len(missing), temperature=keys[0][1])
+        else:
+            # No multi-sample request: fetch the missing samples concurrently instead
+            fresh = _call_concurrently(
+                lambda _: self.client.call(prompt, temperature=keys[0][1]), missing, max_workers=len(missing)
+            )
+        for i, response in zip(missing, fresh):
+            responses[i] = response
+            self._store(keys[i], response)
+        return responses
+    
+    def call_batch(self, prompts: List[str], temperature: Optional[float] = None,
+                   max_workers: int = 4) -> List[str]:
+        """
+        Call the wrapped client for several prompts, answering cached ones locally.
+        
+        Args:
+            prompts: Input prompts
+            temperature: Optional override for temperature
+            max_workers: Maximum number of concurrent requests
+        
+        Returns:
+            Generated responses in the same order as prompts
+        """
+        return _call_concurrently(lambda prompt: self.call(prompt, temperature), prompts, max_workers)
+    
+    def cache_clear(self):
+        """Drop in-memory responses (the disk tier is kept)."""
+        with self._lock:
+            self._memory.clear()
+    
+    def _key(self, prompt: str, temperature: Optional[float], sample_index: int) -> tuple:
+        if temperature is None:
+            temperature = getattr(self.client, 'temperature', 0.0)
+        # Prompts differing only in spacing or line breaks share an entry
+        return (" ".join(prompt.split()), float(temperature), sample_index)
+    
+    def _disk_key(self, key: tuple) -> str:
+        normalized_prompt, temperature, sample_index = key
+        return DiskCache.make_key(self.model, f"{temperature:.3f}", str(sample_index), normalized_prompt)
+    
+    def _lookup(self, key: tuple) -> Optional[str]:
+        """Return the cached response from memory or disk, or None on a miss."""
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                return response
+        if self.cache is not None:
+            response = self.cache.get(self._disk_key(key))
+            if response is not None:
+                logger.debug("LLM disk cache hit")
+                self._remember(key, response)
+                return response
+        return None
+    
+    def _store(self, key: tuple, response: str):
+        """Cache a fresh response; empty responses are not cached so they are retried."""
+        if not response:
+            return
+        self._remember(key, response)
+        if self.cache is not None:
+            self.cache.set(self._disk_key(key), response)
+    
+    def _remember(self, key: tuple, response: str):
+        with self._lock:
+            self._memory[key] = response
+            self._memory.move_to_end(key)
+            if len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
 
 class LLMFactory:
     """Factory for creating LLM clients."""
@@ -1,6 +1,10 @@
 from typing import Dict, List
 import logging
+import os
 from config.settings import config
+from src.models.llm_client import CachedLLMClient
+from src.knowledge.sources import CachedKnowledgeSource
+from src.utils.disk_cache import DiskCache
 from src.core.reasoning import ReasoningPreparation
 from src.core.query_generator import AdaptiveQueryGenerator
 from src.core.rationale_corrector import RationaleCorrector
@@ -18,8 +22,21 @@ class ChainOfKnowledge:
             llm_client: LLM client (TogetherAIClient with Llama 3 70B)
             knowledge_sources: Dictionary of knowledge sources
         """
-        # Use same LLM client for all stages for consistency
+        # Use same LLM client for all stages for consistency; identical calls
+        # (e.g. temperature-0 query generation) are answered from the response cache
+        if not isinstance(llm_client, CachedLLMClient):
+            disk_cache = None
+            if config.RESPONSE_CACHE_ENABLED:
+                disk_cache = DiskCache(os.path.join(config.RESPONSE_CACHE_DIR, "llm"))
+            llm_client = CachedLLMClient(llm_client, disk_cache)
         self.llm_client = llm_client
+        # Search results repeat across runs and similar questions; keep them on disk
+        if not config.CACHE_BYPASS:
+            search_cache = DiskCache(config.SEARCH_CACHE_DIR, max_age=config.SEARCH_CACHE_TTL)
+            knowledge_sources = {
+                name: source if isinstance(source, CachedKnowledgeSource) else CachedKnowledgeSource(source, search_cache)
+                for name, source in knowledge_sources.items()
+            }
         self.reasoning = ReasoningPreparation(llm_client)
         self.query_generator = AdaptiveQueryGenerator(llm_client, knowledge_sources)
         self.corrector = RationaleCorrector(llm_client)
@@ -31,17 +48,14 @@ class ChainOfKnowledge:
         logger.info(f"Processing question: {question[:100]}...")
         
         # Use fewer rationales for FEVER to save tokens (full pipeline uses more API calls)
+        # Passed per call rather than mutating self.reasoning.k so concurrent runs don't race
+        k = None
         if "Claim:" in question:
-            original_k = self.reasoning.k
-            self.reasoning.k = config.NUM_RATIONALES_FEVER
-            logger.debug(f"Using {self.reasoning.k} rationales for FEVER question")
+            k = config.NUM_RATIONALES_FEVER
+            logger.debug(f"Using {k} rationales for FEVER question")
         
         # Stage 1: Reasoning Preparation
-        rationales = self.reasoning.generate_rationales(question)
-        
-        # Restore original k if changed
-        if "Claim:" in question:
-            self.reasoning.k = original_k
+        rationales = self.reasoning.generate_rationales(question, k=k)
         answers = self.reasoning.generate_answers(question, rationales)
         domains = self.reasoning.identify_domains(question)
         
@@ -72,6 +86,14 @@ class ChainOfKnowledge:
         logger.info("Stage 2: Dynamic Knowledge Adapting (Progressive Correction)")
         corrected_rationales = []
         
+        # Queries for the first domain are needed for every rationale: generate them in one batch
+        batched_queries = None
+        if domains:
+            try:
+                batched_queries = self.query_generator.generate_queries_batch(rationales, domains[0])
+            except Exception as e:
+                logger.warning(f"Batched query generation failed, falling back to per-rationale queries: {str(e)}")
+        
         for i, rationale in enumerate(rationales):
             # For progressive correction: build context from previous corrected rationales
             context = ""
@@ -81,10 +103,13 @@ class ChainOfKnowledge:
                     context += f"{j+1}. {prev_corrected}\n"
             
             knowledge_found = False
-            for domain in domains:
+            for d, domain in enumerate(domains):
                 try:
                     # Generate query from current rationale (with context awareness)
-                    query, query_type = self.query_generator.generate_query(rationale, domain)
+                    if d == 0 and batched_queries is not None:
+                        query, query_type = batched_queries[i]
+                    else:
+                        query, query_type = self.query_generator.generate_query(rationale, domain)
                     knowledge = self.query_generator.execute_query(query, query_type, domain)
                     
                     if knowledge and knowledge != "No results found" and len(knowledge.strip()) > 10:
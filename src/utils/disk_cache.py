@@ -0,0 +1,59 @@
+"""Persistent on-disk key/value cache."""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class DiskCache:
+    """JSON-file cache sharded into subdirectories by the first two hex chars of the key."""
+    
+    def __init__(self, cache_dir: str, max_age: Optional[float] = None):
+        """Initialize disk cache.
+        
+        Args:
+            cache_dir: Root directory for cache files
+            max_age: Optional entry lifetime in seconds (entries never expire if None)
+        """
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+    
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Build a SHA-256 cache key from NUL-separated parts."""
+        return hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing, expired or unreadable."""
+        try:
+            with open(self._path(key), 'r') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable cache entry {key}: {str(e)}")
+            return None
+        if self.max_age is not None and time.time() - entry.get('timestamp', 0) > self.max_age:
+            return None
+        return entry.get('value')
+    
+    def set(self, key: str, value: Any):
+        """Store value under key, writing atomically so readers never see partial files."""
+        path = self._path(key)
+        shard_dir = os.path.dirname(path)
+        os.makedirs(shard_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=shard_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'value': value, 'timestamp': time.time()}, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
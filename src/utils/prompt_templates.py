@@ -63,3 +63,14 @@ Examples:
 
 Final Answer:"""
 
+
+BATCH_ANSWER_PROMPT_TEMPLATE = """Answer each of the following questions.
+
+{questions}
+
+IMPORTANT: Reply with one line per question, numbered to match, containing ONLY the answer.
+- For multiple choice (A, B, C, D): Provide only the letter.
+- For factual questions: Provide only the specific fact or entity name.
+- Do NOT include explanations, reasoning, or additional text.
+
+Answers:"""
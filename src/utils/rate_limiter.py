@@ -0,0 +1,40 @@
+"""Adaptive request throttling shared by concurrent workers."""
+import threading
+import time
+
+class AdaptiveRateLimiter:
+    """Space out request starts across threads, slowing down on rate-limit errors."""
+    
+    def __init__(self, min_interval: float, max_interval: float = 60.0, decay: float = 0.9):
+        """Initialize rate limiter.
+        
+        Args:
+            min_interval: Minimum seconds between request starts
+            max_interval: Upper bound the interval can grow to after rate limits
+            decay: Factor applied to the interval after each success (recovers towards min_interval)
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.decay = decay
+        self.interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until the caller may start its next request."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+    
+    def on_success(self):
+        """Relax the interval after a successful request."""
+        with self._lock:
+            self.interval = max(self.min_interval, self.interval * self.decay)
+    
+    def on_rate_limit(self):
+        """Double the interval after the provider rejected a request."""
+        with self._lock:
+            self.interval = min(self.max_interval, self.interval * 2)
@@ -0,0 +1,56 @@
+"""In-memory cache keyed by text similarity instead of exact text."""
+import threading
+from typing import Any, Optional
+import numpy as np
+
+class SemanticCache:
+    """Return values stored for near-duplicate texts (cosine similarity of character trigrams).
+    
+    Texts are embedded as L2-normalized bags of hashed character trigrams, so a lookup is
+    one matrix-vector product over the stored rows. The oldest entries are evicted first.
+    """
+    
+    def __init__(self, threshold: float = 0.92, maxsize: int = 512, dim: int = 512):
+        """Initialize semantic cache.
+        
+        Args:
+            threshold: Minimum cosine similarity for a lookup to count as a hit
+            maxsize: Maximum number of stored entries
+            dim: Number of hash buckets for trigram features
+        """
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.dim = dim
+        self._vectors = np.zeros((maxsize, dim), dtype=np.float32)
+        self._values = [None] * maxsize
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+    
+    def _embed(self, text: str) -> np.ndarray:
+        padded = f"  {text.lower()} "
+        buckets = [hash(padded[i:i + 3]) % self.dim for i in range(len(padded) - 2)]
+        vector = np.bincount(buckets, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def get(self, text: str) -> Optional[Any]:
+        """Return the value stored for the most similar text, or None below the threshold."""
+        query = self._embed(text)
+        with self._lock:
+            if not self._size:
+                return None
+            sims = self._vectors[:self._size] @ query
+            best = int(sims.argmax())
+            if sims[best] >= self.threshold:
+                return self._values[best]
+        return None
+    
+    def set(self, text: str, value: Any):
+        """Store value for text, evicting the oldest entry when full."""
+        vector = self._embed(text)
+        with self._lock:
+            self._vectors[self._next] = vector
+            self._values[self._next] = value
+            self._next = (self._next + 1) % self.maxsize
+            self._size = min(self._size + 1, self.maxsize)